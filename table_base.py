@@ -28,6 +28,8 @@ from __future__ import division
 import math
 import re
 import csv
+import io
+import contextlib
 
 try:
     from . import table_line_parser as tparser
@@ -49,6 +51,13 @@ class TableConfiguration:
         self.hline_in_border = None
         self.custom_column_alignment = True
 
+        #only for csv to table conversion
+        self.csv_sniff_sample_size = 64 * 1024
+        self.csv_sniff_sample_lines = 1000
+
+        #skip pack of already aligned rows, see TextTable.pack_edited_row
+        self.fast_align = True
+
 
 class TableSyntax:
 
@@ -62,6 +71,8 @@ class TableSyntax:
         self.intelligent_formatting = self.table_configuration.intelligent_formatting
 
         self.line_parser = tparser.LineParserPlus("(?:[|])")
+        # #+TBLFM formulas line bellow the table, see table_formula
+        self.formula_support = False
         # Must be set in sublass constructor
         self.table_parser = None
         self.table_driver = None
@@ -74,19 +85,30 @@ class Column(object):
     ALIGN_RIGHT = 'right'
     ALIGN_CENTER = 'center'
 
+    # columns are the most numerous objects, keep them small
+    __slots__ = ('row', 'col_len', 'align', 'header', 'colspan', 'rowspan',
+                 'pseudo_columns', 'left_border_text', 'right_border_text')
+
     def __init__(self, row):
         self.row = row
-        self.table = row.table
-        self.syntax = row.table.syntax
         self.col_len = 0
         self.align = None
         self.header = None
         self.colspan = 1
         self.rowspan = 1
-        self.pseudo_columns = []
+        # shared empty tuple, Row.append creates list for colspan column
+        self.pseudo_columns = ()
         self.left_border_text = '|'
         self.right_border_text = '|'
 
+    @property
+    def table(self):
+        return self.row.table
+
+    @property
+    def syntax(self):
+        return self.row.table.syntax
+
     def min_len(self):
         raise NotImplementedError
 
@@ -101,6 +123,7 @@ class Column(object):
 
 
 class PseudoColumn(Column):
+    __slots__ = ('master_column', 'data')
 
     def __init__(self, row, master_column):
         Column.__init__(self, row)
@@ -117,13 +140,17 @@ class PseudoColumn(Column):
         return True
 
 
-class Row:
+class Row(object):
+    __slots__ = ('table', 'columns')
 
     def __init__(self, table):
         self.table = table
-        self.syntax = table.syntax
         self.columns = []
 
+    @property
+    def syntax(self):
+        return self.table.syntax
+
     def __getitem__(self, index):
         return self.columns[index]
 
@@ -144,6 +171,8 @@ class Row:
 
     def append(self, column):
         self.columns.append(column)
+        if column.colspan > 1 and not column.pseudo_columns:
+            column.pseudo_columns = []
         for i in range(0, column.colspan - 1):
             psedo_column = PseudoColumn(self, column)
             column.pseudo_columns.append(psedo_column)
@@ -172,6 +201,7 @@ class Row:
 
 
 class DataRow(Row):
+    __slots__ = ()
 
     def new_empty_column(self):
         return DataColumn(self, '')
@@ -184,6 +214,7 @@ class DataRow(Row):
 
 
 class DataColumn(Column):
+    __slots__ = ('data', 'left_space', 'right_space')
 
     def __init__(self, row, data):
         Column.__init__(self, row)
@@ -248,12 +279,100 @@ def check_condition(condition, message):
         raise TableException(message)
 
 
+def parse_number(text):
+    """Return float value of text or None, infinity and NaN are not numbers."""
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    if math.isinf(value) or math.isnan(value):
+        return None
+    return value
+
+
+def format_number(value):
+    if math.isinf(value) or math.isnan(value):
+        return str(value)
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return "{0:.10g}".format(value)
+
+
+def common_align(aligns):
+    """Most frequent alignment, the first one on a tie, None if no one."""
+    counts = {}
+    for align in aligns:
+        if align is not None:
+            counts[align] = counts.get(align, 0) + 1
+    best = None
+    for align in aligns:
+        if align is not None and (best is None or counts[align] > counts[best]):
+            best = align
+    return best
+
+
+class ColumnStats:
+    """
+    Statistics of numbers in a column, collected in one pass by add.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.empty = 0
+        self.text = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def add(self, text):
+        text = text.strip()
+        if not text:
+            self.empty += 1
+            return
+        value = parse_number(text)
+        if value is None:
+            self.text += 1
+            return
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def mean(self):
+        if self.count == 0:
+            return None
+        return self.sum / self.count
+
+    def __str__(self):
+        if self.count == 0:
+            return "no numbers"
+        return ("count={0} sum={1} min={2} max={3} mean={4}"
+                .format(self.count, format_number(self.sum),
+                        format_number(self.min), format_number(self.max),
+                        format_number(self.mean())))
+
+
+_BORDER_MASK_PATTERN = re.compile(r"[^|+]")
+_NON_ASCII_PATTERN = re.compile(r"[^\x00-\x7f]")
+
+
+def _border_mask(line):
+    # '|' at border offsets, ' ' elsewhere
+    return _BORDER_MASK_PATTERN.sub(' ', line).replace('+', '|')
+
+
 class TextTable:
 
     def __init__(self, syntax):
         self.syntax = syntax
         self.prefix = ""
         self.rows = []
+        self._batch_level = 0
+        self._pack_pending = False
+        self._canonical_lines = None
+        self._edited_row = -1
         self.pack()
 
     def __len__(self):
@@ -295,14 +414,20 @@ class TextTable:
                     row.columns = row.columns[:-shift]
 
     def pack(self):
+        self._canonical_lines = None
         if len(self.rows) == 0:
             return
 
+        col_lens = self._pack_column_lens()
+        if col_lens is not None:
+            self._pack_alignment(col_lens)
+
+    def _pack_column_lens(self):
         column_count = self._max_column_count()
 
         if column_count == 0:
             self.rows = []
-            return
+            return None
 
         #intelligent formatting
         if self.syntax.intelligent_formatting:
@@ -338,7 +463,9 @@ class TextTable:
         for row in self.rows:
             for column, col_len in zip(row.columns, col_lens):
                 column.col_len = col_len
+        return col_lens
 
+    def _pack_alignment(self, col_lens):
         #header
         header_separator_index = -1
         first_data_index = -1
@@ -379,15 +506,139 @@ class TextTable:
         for row in self.rows[start_row_ind:]:
             if (row.is_data()
                     and col_ind < len(row.columns)
-                    and len(row.columns[col_ind].data.strip()) > 0):
-                        try:
-                            float(row.columns[col_ind].data)
-                        except ValueError:
-                            return False
+                    and len(row.columns[col_ind].data.strip()) > 0
+                    and parse_number(row.columns[col_ind].data) is None):
+                return False
         return True
 
-    def render_lines(self):
-        return [self.prefix + row.render() for row in self.rows]
+    def column_stats(self, col):
+        """Statistics of column col over not header data rows."""
+        stats = ColumnStats()
+        for row in self.rows:
+            if row.is_data() and col < len(row):
+                column = row.columns[col]
+                if not column.header and not column.pseudo():
+                    stats.add(column.data)
+        return stats
+
+    def pack_edited_row(self, lines, row_ind):
+        """
+        Pack the table parsed from lines when every line except row_ind
+        is already aligned, render_lines then renders only row_ind.
+        Return False if the table needs a full pack.
+        """
+        if (not self.syntax.table_configuration.fast_align
+                or len(lines) != len(self.rows) or len(lines) < 2
+                or not 0 <= row_ind < len(lines)):
+            return False
+
+        # equal line widths and borders at identical offsets
+        ref_ind = 1 if row_ind == 0 else 0
+        ref_mask = _border_mask(lines[ref_ind])
+        for ind, line in enumerate(lines):
+            if ind == row_ind:
+                continue
+            if (not line.startswith(self.prefix)
+                    or _NON_ASCII_PATTERN.search(line) is not None
+                    or _border_mask(line) != ref_mask):
+                return False
+        borders = [ind for ind, c in enumerate(ref_mask) if c == '|']
+        if (len(borders) < 2 or borders[0] != len(self.prefix)
+                or borders[-1] != len(ref_mask) - 1):
+            return False
+        col_lens = [right - left - 1
+                    for left, right in zip(borders, borders[1:])]
+        column_count = len(col_lens)
+
+        # edited separator may move header separator
+        edited_row = self.rows[row_ind]
+        if not edited_row.is_data() or len(edited_row) > column_count:
+            return False
+        for column in edited_row.columns:
+            if column.colspan > 1 or column.rowspan > 1 or column.pseudo():
+                return False
+        for ind, row in enumerate(self.rows):
+            if ind != row_ind and len(row) != column_count:
+                return False
+        for i in range(column_count - len(edited_row)):
+            edited_row.columns.append(edited_row.new_empty_column())
+
+        for row in self.rows:
+            for column, col_len in zip(row.columns, col_lens):
+                column.col_len = col_len
+        self._pack_alignment(col_lens)
+
+        # edited row might have been header separator of data rows above
+        if self.syntax.detect_header and not edited_row.columns[0].header:
+            for row in self.rows[:row_ind]:
+                if row.is_data():
+                    if not row.columns[0].header:
+                        return False
+                    break
+
+        # edited row must fit and no column may shrink
+        min_lens = [column.min_len() for column in edited_row.columns]
+        if max([min_len - col_len for min_len, col_len
+                in zip(min_lens, col_lens)]) > 0:
+            return False
+        tight = [min_len == col_len for min_len, col_len
+                 in zip(min_lens, col_lens)]
+        # every row must render to its line, data cells are checked one
+        # by one to skip the join of the row
+        for ind, row in enumerate(self.rows):
+            if ind == row_ind:
+                continue
+            if not row.is_data() or row.columns[0].header:
+                if self.prefix + row.render() != lines[ind]:
+                    return False
+                for col_ind, column in enumerate(row.columns):
+                    if column.min_len() == col_lens[col_ind]:
+                        tight[col_ind] = True
+                continue
+            for col_ind, column in enumerate(row.columns):
+                if not isinstance(column, DataColumn):
+                    return False
+                col_len = col_lens[col_ind]
+                if self.syntax.keep_space_left:
+                    min_len = column.min_len()
+                else:
+                    # ascii line, wlen is len
+                    min_len = max(3, len(column.data.strip()) + 2)
+                if min_len > col_len:
+                    return False
+                if min_len == col_len:
+                    tight[col_ind] = True
+                if type(column) is not DataColumn or self.syntax.keep_space_left:
+                    if column.render() != column.data:
+                        return False
+                    continue
+                # DataColumn.render of ascii cell without spans
+                norm = column.data.strip()
+                if column.align == Column.ALIGN_RIGHT:
+                    value = norm.rjust(col_len - 2)
+                elif column.align == Column.ALIGN_CENTER:
+                    value = norm.center(col_len - 2)
+                else:
+                    value = norm.ljust(col_len - 2)
+                if ' ' + value + ' ' != column.data:
+                    return False
+        if not all(tight):
+            return False
+
+        self._canonical_lines = lines
+        self._edited_row = row_ind
+        return True
+
+    def render_lines(self, start=0, stop=None):
+        if stop is None:
+            stop = len(self.rows)
+        if self._canonical_lines is not None:
+            lines = self._canonical_lines[start:stop]
+            if start <= self._edited_row < stop:
+                row = self.rows[self._edited_row]
+                lines[self._edited_row - start] = self.prefix + row.render()
+            return lines
+        return [self.prefix + row.render() for row in self.rows[start:stop]]
 
     def render(self):
         return "\n".join(self.render_lines())
@@ -410,12 +661,36 @@ class TextTable:
                         "Expected not colspan column, but column {0}"
                         " is colspan".format(col))
 
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Defer pack of mutators until the outermost batch ends,
+        the table is not packed inside the batch.
+        """
+        self._batch_level += 1
+        try:
+            yield self
+        finally:
+            self._batch_level -= 1
+            if self._batch_level == 0 and self._pack_pending:
+                self._pack_pending = False
+                self.pack()
+
+    def _changed(self):
+        if self._batch_level > 0:
+            self._pack_pending = True
+        else:
+            self.pack()
+
     def delete_column(self, col):
-        self.assert_not_col_colspan(col)
+        self.delete_columns(col, col + 1)
+
+    def delete_columns(self, start, stop):
+        for col in range(start, stop):
+            self.assert_not_col_colspan(col)
         for row in self.rows:
-            if col < len(row):
-                del row.columns[col]
-        self.pack()
+            del row.columns[start:stop]
+        self._changed()
 
     def swap_columns(self, i, j):
         self.assert_not_col_colspan(i)
@@ -423,13 +698,19 @@ class TextTable:
         for row in self.rows:
             if i < len(row) and j < len(row):
                 row.columns[i], row.columns[j] = row.columns[j], row.columns[i]
-        self.pack()
+        self._changed()
 
     def delete_row(self, i):
         assert 0 <= i < len(self.rows)
 
-        del self.rows[i]
-        self.pack()
+        self.delete_rows(i, i + 1)
+
+    def delete_rows(self, start, stop):
+        check_condition(0 <= start <= stop <= len(self.rows),
+                        "Index out of range")
+
+        del self.rows[start:stop]
+        self._changed()
 
     def swap_rows(self, i, j):
         check_condition((0 <= i < len(self.rows) and
@@ -442,21 +723,164 @@ class TextTable:
         for column in self.rows[j].columns:
             column.header = False
 
-        self.pack()
+        self._changed()
 
     def insert_empty_row(self, i):
+        self.insert_empty_rows(i, 1)
+
+    def insert_empty_rows(self, i, count):
         check_condition(i >= 0, "Index should be more than zero")
 
-        self.rows.insert(i, DataRow(self))
-        self.pack()
+        self.rows[i:i] = [DataRow(self) for n in range(count)]
+        self._changed()
+
+    def _sort_key(self, numeric):
+        # (group, value), groups keep their order in reverse sort
+        def key(text):
+            number = parse_number(text)
+            if numeric and number is not None:
+                return (0, (number, text))
+            elif numeric:
+                return (1 if text else 2, (0, text))
+            else:
+                return (0 if text else 2, (text.lower(), text))
+        return key
+
+    def sort_rows(self, col, numeric=None, reverse=False):
+        """
+        Sort data rows by column col within each block of rows delimited
+        by separator rows, header rows are not sorted. If numeric is None
+        column is sorted as numbers if every not empty value is a number.
+        Numbers are sorted before other values and empty values are last,
+        also in reverse order.
+        """
+        check_condition(col >= 0, "Index should be more than zero")
+        for row in self.rows:
+            for column in row.columns:
+                check_condition(column.rowspan == 1,
+                                "Sort is not permitted for table with rowspan")
+
+        values = []
+        for row in self.rows:
+            if row.is_data() and col < len(row):
+                values.append(row.columns[col].data.strip())
+            else:
+                values.append(None)
+
+        if numeric is None:
+            numeric = True
+            for row, value in zip(self.rows, values):
+                if (value and not self._is_header_row(row)
+                        and parse_number(value) is None):
+                    numeric = False
+                    break
+
+        key = self._sort_key(numeric)
+        keys = [key(value or '') for value in values]
+
+        start = 0
+        while start < len(self.rows):
+            stop = start
+            while stop < len(self.rows) and self.rows[stop].is_data():
+                stop += 1
+            if stop > start and not self._is_header_row(self.rows[start]):
+                order = sorted(range(start, stop),
+                               key=lambda ind: keys[ind][1], reverse=reverse)
+                order.sort(key=lambda ind: keys[ind][0])
+                self.rows[start:stop] = [self.rows[ind] for ind in order]
+            start = stop + 1
+        self._changed()
+
+    def transpose(self):
+        """
+        Swap rows and columns of the table content rows. Separator rows
+        before and after the content are kept, rows between the first and
+        the second content row are kept after the first transposed row.
+        Transposed rows get separators between them when the syntax needs
+        them or the table had separators between other content rows.
+        Transposed columns get the most common alignment of the columns.
+        """
+        for row in self.rows:
+            for column in row.columns:
+                check_condition(column.colspan == 1 and column.rowspan == 1,
+                                "Transpose is not permitted for table "
+                                "with colspan or rowspan")
+        driver = self.syntax.table_driver
+        aligns = driver.column_aligns(self)
+
+        content = [ind for ind, row in enumerate(self.rows)
+                   if not row.is_separator() and not row.is_align()]
+        if len(content) == 0:
+            return
+        content_rows = [self.rows[ind] for ind in content]
+        leading = self.rows[:content[0]]
+        trailing = self.rows[content[-1] + 1:]
+        header_rows = []
+        row_separators = driver.row_separators
+        if len(content) > 1:
+            header_rows = self.rows[content[0] + 1:content[1]]
+            row_separators = (row_separators or
+                              len(content) - 1 < content[-1] - content[1] + 1)
+
+        column_count = max([len(row) for row in content_rows])
+        for row in content_rows:
+            for col in range(len(row), column_count):
+                row.columns.append(row.new_empty_column())
+
+        row_class = type(content_rows[0])
+        rows = []
+        for columns in zip(*[row.columns for row in content_rows]):
+            new_row = row_class(self)
+            for column in columns:
+                column.row = new_row
+                column.header = None
+            new_row.columns = list(columns)
+            rows.append(new_row)
+
+        new_aligns = [common_align(aligns)] * len(content_rows)
+
+        def keep(row):
+            # align row gets alignment of new columns, others are refilled
+            # by pack
+            if row.is_align():
+                return driver.create_align_row(self, new_aligns)
+            row.columns = []
+            return row
+
+        def separator():
+            return driver.create_separator_row(self, '-')
+
+        between = [keep(row) for row in header_rows]
+        if len(between) == 0 and row_separators:
+            between = [separator()]
+        new_rows = rows[:1]
+        for ind, row in enumerate(rows[1:]):
+            if ind == 0:
+                new_rows.extend(between)
+            elif row_separators:
+                new_rows.append(separator())
+            new_rows.append(row)
+        new_rows = ([keep(row) for row in leading] + new_rows +
+                    [keep(row) for row in trailing])
+        self.rows = [row for row in new_rows if row is not None]
+        self._changed()
+
+    def _is_header_row(self, row):
+        for column in row.columns:
+            if column.header:
+                return True
+        return False
 
     def insert_empty_column(self, i):
+        self.insert_empty_columns(i, 1)
+
+    def insert_empty_columns(self, i, count):
         check_condition(i >= 0, "Index should be more than zero")
         self.assert_not_col_colspan(i)
 
         for row in self.rows:
-            row.columns.insert(i, row.new_empty_column())
-        self.pack()
+            row.columns[i:i] = [row.new_empty_column() for n in range(count)]
+        self._changed()
 
 
 class TableException(Exception):
@@ -486,9 +910,13 @@ class TablePos:
 
 
 class TableDriver:
+    # content rows are separated by separator rows, as in grid tables
+    row_separators = False
 
     def __init__(self, syntax):
         self.syntax = syntax
+        # description of the fallback of the last CSV conversion or None
+        self.csv_fallback = None
 
     def visual_column_count(self, table, row_ind):
         return sum([1 for column in table[row_ind].columns
@@ -533,6 +961,31 @@ class TableDriver:
             col_pos = 1
         return base_len + col_pos
 
+    def editor_repeat(self, operation, table, table_pos, count,
+                      deferred_pack=True):
+        """
+        Apply editor operation count times starting from table_pos.
+        With deferred_pack the table is packed once at the end, operation
+        should not depend on packed table then. Repeating stops at the
+        first failed operation after a successful one.
+        """
+        check_condition(count > 0, "Repeat count should be more than zero")
+        if deferred_pack:
+            with table.batch():
+                return self._editor_repeat(operation, table, table_pos, count)
+        return self._editor_repeat(operation, table, table_pos, count)
+
+    def _editor_repeat(self, operation, table, table_pos, count):
+        msg, table_pos = operation(table, table_pos)
+        for n in range(count - 1):
+            if table.empty():
+                break
+            try:
+                msg, table_pos = operation(table, table_pos)
+            except TableException:
+                break
+        return msg, table_pos
+
     def editor_move_column_left(self, table, table_pos):
         internal_pos = self.visual_to_internal_index(table, table_pos)
         field_num = internal_pos.field_num
@@ -635,6 +1088,91 @@ class TableDriver:
         return ("Row inserted",
                 TablePos(table_pos.row_num, table_pos.field_num))
 
+    def _column_range(self, table, first_pos, last_pos):
+        first = self.visual_to_internal_index(table, first_pos).field_num
+        last = self.visual_to_internal_index(table, last_pos).field_num
+        return min(first, last), max(first, last) + 1
+
+    def editor_delete_columns(self, table, first_pos, last_pos):
+        start, stop = self._column_range(table, first_pos, last_pos)
+        for col in range(start, stop):
+            if table.is_col_colspan(col):
+                raise TableException("Delete column is not permitted for "
+                                     "colspan column")
+        table.delete_columns(start, stop)
+        new_table_pos = TablePos(first_pos.row_num,
+                                 min(first_pos.field_num, last_pos.field_num))
+        if (not table.empty() and
+                new_table_pos.field_num >= len(table[new_table_pos.row_num])):
+            new_table_pos.field_num = len(table[new_table_pos.row_num]) - 1
+        return ("{0} columns deleted".format(stop - start), new_table_pos)
+
+    def editor_insert_columns(self, table, first_pos, last_pos):
+        start, stop = self._column_range(table, first_pos, last_pos)
+        if table.is_col_colspan(start):
+            raise TableException("Insert column is not permitted for "
+                                 "colspan column")
+        table.insert_empty_columns(start, stop - start)
+        return ("{0} columns inserted".format(stop - start),
+                TablePos(first_pos.row_num,
+                         min(first_pos.field_num, last_pos.field_num)))
+
+    def editor_kill_rows(self, table, first_pos, last_pos):
+        start = min(first_pos.row_num, last_pos.row_num)
+        stop = max(first_pos.row_num, last_pos.row_num) + 1
+        table.delete_rows(start, stop)
+        new_table_pos = TablePos(start, first_pos.field_num)
+        if start == len(table):
+            new_table_pos.row_num = start - 1
+        return ("{0} rows deleted".format(stop - start), new_table_pos)
+
+    def editor_insert_rows(self, table, first_pos, last_pos):
+        start = min(first_pos.row_num, last_pos.row_num)
+        stop = max(first_pos.row_num, last_pos.row_num) + 1
+        table.insert_empty_rows(start, stop - start)
+        return ("{0} rows inserted".format(stop - start),
+                TablePos(start, first_pos.field_num))
+
+    def editor_sort(self, table, table_pos, numeric=None, reverse=False):
+        internal_pos = self.visual_to_internal_index(table, table_pos)
+        table.sort_rows(internal_pos.field_num, numeric, reverse)
+        return ("Table sorted by column {0}".format(table_pos.field_num + 1),
+                TablePos(table_pos.row_num, table_pos.field_num))
+
+    def editor_transpose(self, table, table_pos):
+        def is_content(row):
+            return not row.is_separator() and not row.is_align()
+
+        content_num = sum([1 for row in table.rows[:table_pos.row_num]
+                           if is_content(row)])
+        table.transpose()
+        content = [ind for ind, row in enumerate(table.rows) if is_content(row)]
+        if len(content) == 0:
+            return ("Table transposed", TablePos(0, 0))
+        row_num = content[min(table_pos.field_num, len(content) - 1)]
+        field_num = min(content_num, self.visual_column_count(table, row_num) - 1)
+        return ("Table transposed", TablePos(row_num, field_num))
+
+    def editor_column_stats(self, table, table_pos, insert_totals=False):
+        internal_pos = self.visual_to_internal_index(table, table_pos)
+        field_num = internal_pos.field_num
+        stats = table.column_stats(field_num)
+        if insert_totals:
+            check_condition(stats.count > 0, "Column has no numbers")
+            separator = self.create_separator_row(table)
+            if separator is not None:
+                table.rows.append(separator)
+            row = DataRow(table)
+            for col in range(len(table[table_pos.row_num])):
+                row.append(row.new_empty_column())
+            if field_num > 0:
+                row[0].data = "Total"
+            row[field_num].data = format_number(stats.sum)
+            table.rows.append(row)
+            table.pack()
+        return ("Column {0}: {1}".format(table_pos.field_num + 1, stats),
+                TablePos(table_pos.row_num, table_pos.field_num))
+
     def editor_insert_single_hline(self, table, table_pos):
         raise TableException("Syntax {0} doesn't support insert single line"
                              .format(self.syntax.name))
@@ -732,25 +1270,255 @@ class TableDriver:
                 break
         return ("Cursor position changed", pos)
 
-    def parse_csv(self, text):
+    def create_separator_row(self, table, separator='-'):
+        return None
+
+    def create_align_row(self, table, aligns):
+        """Row with column alignments or None if syntax has no such row."""
+        return None
+
+    def create_content_row(self, table, cells, header=False):
+        """
+        Row from cells, a list of (text, colspan, align) tuples.
+        Syntax without colspan gets colspan cell followed by empty cells.
+        """
+        row = DataRow(table)
+        for text, colspan, align in cells:
+            row.append(DataColumn(row, text))
+            for col in range(colspan - 1):
+                row.append(DataColumn(row, ''))
+        return row
+
+    def arrange_converted_rows(self, table, rows, aligns):
+        """
+        Rows of table converted from another syntax, rows is a list of
+        (row, header) tuples. Repeated separators are dropped, header rows
+        followed by other content get a separator.
+        """
+        arranged = []
+        header_above = False
+        for row, header in rows:
+            if row.is_separator():
+                if len(arranged) == 0 or not arranged[-1].is_separator():
+                    arranged.append(row)
+                header_above = False
+                continue
+            if row.is_align():
+                arranged.append(row)
+                continue
+            if header_above and not header:
+                separator = self.create_separator_row(table)
+                if separator is not None:
+                    arranged.append(separator)
+            arranged.append(row)
+            header_above = header
+        return arranged
+
+    def converted_header_count(self, rows):
+        """
+        Count of content rows above the header separator in a list of
+        (row, header) tuples, the first separator below content or the
+        end of header rows.
+        """
+        count = 0
+        header_above = False
+        for row, header in rows:
+            if row.is_separator() or row.is_align():
+                if count > 0:
+                    return count
+                continue
+            if header_above and not header:
+                return count
+            header_above = header
+            count += 1
+        return count
+
+    def column_aligns(self, table):
+        """Alignments of visual columns from the first align row."""
+        for row in table.rows:
+            if row.is_align():
+                return [column.align_follow() for column in row.columns
+                        if not column.pseudo()]
+        return []
+
+    def cell_align(self, column):
+        """Alignment given by the cell itself."""
+        return None
+
+    def _csv_sample(self, text):
+        sample_size = self.syntax.table_configuration.csv_sniff_sample_size
+        sample_lines = self.syntax.table_configuration.csv_sniff_sample_lines
+        sample = text[:sample_size]
+        if len(sample) < len(text):
+            # partial last line confuses the sniffer
+            last_line_end = sample.rfind('\n')
+            if last_line_end > 0:
+                sample = sample[:last_line_end]
+        lines = sample.splitlines(True)
+        if len(lines) > sample_lines:
+            sample = "".join(lines[:sample_lines])
+        return sample
+
+    def csv_dialect(self, text, delimiter=None, quotechar=None):
+        """
+        Dialect of CSV text, sniffed unless delimiter is given. If sniffer
+        fails the dialect is excel with the given quotechar, or None (a line
+        is a record) without quotechar, csv_fallback describes it.
+        """
+        self.csv_fallback = None
+        if delimiter is not None:
+            class dialect(csv.excel):
+                pass
+            dialect.delimiter = str(delimiter)
+        else:
+            try:
+                dialect = csv.Sniffer().sniff(self._csv_sample(text))
+            except csv.Error:
+                if quotechar is None:
+                    self.csv_fallback = ("CSV dialect is not detected, "
+                                         "a line is a row")
+                    return None
+                self.csv_fallback = ("CSV dialect is not detected, "
+                                     "used excel dialect")
+
+                class dialect(csv.excel):
+                    pass
+        if quotechar is not None:
+            dialect.quotechar = str(quotechar)
+        return dialect
+
+    def _csv_error_fallback(self):
+        self.csv_fallback = "CSV is not valid, a line is a row"
+        return None
+
+    def _csv_records(self, text, dialect):
+        lines = io.StringIO(text, newline='')
+        if dialect is None:
+            return ([line.rstrip('\r\n')] for line in lines)
+        else:
+            return csv.reader(lines, dialect)
+
+    def _csv_row(self, table, cols, column_count=0):
+        row = DataRow(table)
+        for col in cols:
+            row.columns.append(DataColumn(row, col))
+        self._csv_pad(row, column_count)
+        return row
+
+    def _csv_pad(self, row, column_count):
+        for i in range(column_count - len(row)):
+            row.columns.append(row.new_empty_column())
+
+    def _csv_columns(self, table, records, separator):
+        col_lens = []
+        number_columns = []
+        for row_ind, cols in enumerate(records):
+            row = self._csv_row(table, cols)
+            for col_ind, column in enumerate(row.columns):
+                if col_ind == len(col_lens):
+                    col_lens.append(0)
+                    number_columns.append(True)
+                col_lens[col_ind] = max(col_lens[col_ind], column.min_len())
+                if (number_columns[col_ind]
+                        and not (row_ind == 0 and separator is not None)
+                        and len(column.data.strip()) > 0
+                        and parse_number(column.data) is None):
+                    number_columns[col_ind] = False
+        if separator is not None:
+            self._csv_pad(separator, len(col_lens))
+            for col_ind, column in enumerate(separator.columns):
+                col_lens[col_ind] = max(col_lens[col_ind], column.min_len())
+        return col_lens, number_columns
+
+    def iter_csv_rows(self, text, delimiter=None, quotechar=None,
+                      has_header=False):
+        """Yield packed rows converted from CSV text one by one.
+
+        The first pass over the text computes column lengths and alignment,
+        the second pass creates and yields rows, so the whole table is never
+        kept in memory. If delimiter is given the dialect is not sniffed.
+        If has_header is true and the syntax supports separator rows, the
+        first record is yielded as a header followed by a separator row.
+        """
+        table = TextTable(self.syntax)
+        dialect = self.csv_dialect(text, delimiter, quotechar)
+        separator = None
+        if has_header:
+            separator = self.create_separator_row(table)
         try:
-            table = TextTable(self.syntax)
-            dialect = csv.Sniffer().sniff(text)
-            table_reader = csv.reader(text.splitlines(), dialect)
-            for cols in table_reader:
-                row = DataRow(table)
-                for col in cols:
-                    row.columns.append(DataColumn(row, col))
-                table.rows.append(row)
+            col_lens, number_columns = self._csv_columns(
+                table, self._csv_records(text, dialect), separator)
         except csv.Error:
-            table = TextTable(self.syntax)
-            for line in text.splitlines():
-                row = DataRow(table)
-                row.columns.append(DataColumn(row, line))
-                table.rows.append(row)
+            dialect = self._csv_error_fallback()
+            if separator is not None:
+                separator.columns = []
+            col_lens, number_columns = self._csv_columns(
+                table, self._csv_records(text, dialect), separator)
+
+        aligns = []
+        for number_column in number_columns:
+            if self.syntax.align_number_right and number_column:
+                aligns.append(Column.ALIGN_RIGHT)
+            else:
+                aligns.append(Column.ALIGN_LEFT)
+
+        if len(col_lens) == 0:
+            return
+        for row_ind, cols in enumerate(self._csv_records(text, dialect)):
+            row = self._csv_row(table, cols, len(col_lens))
+            is_header = row_ind == 0 and separator is not None
+            for column, col_len, align in zip(row.columns, col_lens, aligns):
+                column.col_len = col_len
+                if is_header:
+                    column.header = True
+                else:
+                    column.align = align
+            yield row
+            if is_header:
+                for column, col_len in zip(separator.columns, col_lens):
+                    column.col_len = col_len
+                yield separator
+
+    def render_csv_lines(self, text, delimiter=None, quotechar=None,
+                         has_header=False):
+        for row in self.iter_csv_rows(text, delimiter, quotechar, has_header):
+            yield row.render()
+
+    def parse_csv(self, text, delimiter=None, quotechar=None,
+                  has_header=False):
+        table = TextTable(self.syntax)
+        dialect = self.csv_dialect(text, delimiter, quotechar)
+        try:
+            rows = [self._csv_row(table, cols)
+                    for cols in self._csv_records(text, dialect)]
+        except csv.Error:
+            dialect = self._csv_error_fallback()
+            rows = [self._csv_row(table, cols)
+                    for cols in self._csv_records(text, dialect)]
+        if has_header and len(rows) > 0:
+            separator = self.create_separator_row(table)
+            if separator is not None:
+                rows.insert(1, separator)
+        table.rows = rows
         table.pack()
         return table
 
+    def iter_table_csv_records(self, table):
+        # separators and align rows have no data, colspan column is
+        # expanded to the master column data followed by empty fields
+        for row in table.rows:
+            if row.is_separator() or row.is_align():
+                continue
+            yield [column.data.strip() for column in row.columns]
+
+    def write_csv(self, table, stream, dialect='excel'):
+        writer = csv.writer(stream, dialect, lineterminator='\n')
+        count = 0
+        for record in self.iter_table_csv_records(table):
+            writer.writerow(record)
+            count += 1
+        return count
+
 
 class BaseTableParser:
 
@@ -777,9 +1545,11 @@ class BaseTableParser:
     def is_table_row(self, row):
         return re.match(r"^\s*[|+]",row) is not None
 
-    def parse_text(self, text):
+    def parse_text(self, text, pack=True):
+        return self.parse_lines(text.splitlines(), pack)
+
+    def parse_lines(self, lines, pack=True):
         table = TextTable(self.syntax)
-        lines = text.splitlines()
         for ind, line in enumerate(lines):
 
             line = self.syntax.line_parser.parse(line)
@@ -787,5 +1557,33 @@ class BaseTableParser:
                 table.prefix = line.prefix
             row = self.parse_row(table, line)
             table.rows.append(row)
-        table.pack()
+        if pack:
+            table.pack()
         return table
+
+    def format_lines(self, lines):
+        """Yield lines with every table formatted.
+
+        Consecutive table rows are buffered and formatted as one table,
+        other lines are yielded as is, so only the current table is kept
+        in memory. Line ends of the table rows are preserved.
+        """
+        block = []
+        for line in lines:
+            text = line.rstrip("\r\n")
+            if self.is_table_row(text):
+                block.append((text, line[len(text):]))
+                continue
+            for formatted in self._format_block(block):
+                yield formatted
+            block = []
+            yield line
+        for formatted in self._format_block(block):
+            yield formatted
+
+    def _format_block(self, block):
+        if len(block) == 0:
+            return []
+        table = self.parse_lines([text for text, line_end in block])
+        return [rendered + line_end for rendered, (text, line_end)
+                in zip(table.render_lines(), block)]
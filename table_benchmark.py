@@ -0,0 +1,504 @@
+# table_benchmark.py - Performance benchmarks for table_lib
+
+# Copyright (C) 2012  Free Software Foundation, Inc.
+
+# Author: Valery Kocubinsky
+# Package: SublimeTableEditor
+# Homepage: https://github.com/vkocubinsky/SublimeTableEditor
+
+# This file is part of SublimeTableEditor.
+
+# SublimeTableEditor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# SublimeTableEditor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with SublimeTableEditor.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks for parse, pack, render and editor operations of every syntax.
+
+Run from the directory which contains the package, for example:
+
+    python -m SublimeTableEditor.table_benchmark --rows 1000 --json out.json
+
+Check for performance regressions against the committed baseline:
+
+    python -m SublimeTableEditor.table_benchmark --check \
+        SublimeTableEditor/benchmark_baseline.json
+
+Each benchmark run is interleaved with a calibration workload and the
+baseline keeps timings relative to it, so the check tolerates a faster,
+slower or busy machine. Hot paths have tighter tolerances in the
+baseline, refresh it with --update-baseline after intended performance
+changes.
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import sys
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    from . import table_lib
+    from . import table_base as tbase
+except ValueError:
+    import table_lib
+    import table_base as tbase
+
+
+SYNTAX_NAMES = ["Simple", "EmacsOrgMode", "Pandoc", "MultiMarkdown",
+                "reStructuredText", "Textile"]
+
+# syntaxes with colspan support
+COLSPAN_SYNTAX_NAMES = ["MultiMarkdown", "Textile"]
+
+EDITOR_OPERATIONS = [
+    "editor_align",
+    "editor_next_field",
+    "editor_previous_field",
+    "editor_next_row",
+    "editor_move_column_left",
+    "editor_move_column_right",
+    "editor_move_row_up",
+    "editor_move_row_down",
+    "editor_delete_column",
+    "editor_insert_column",
+    "editor_kill_row",
+    "editor_insert_row",
+    "editor_insert_single_hline",
+    "editor_insert_double_hline",
+    "editor_insert_hline_and_move",
+    "editor_join_lines",
+]
+
+
+def _cell_text(row_ind, col_ind, wide):
+    if col_ind % 3 == 2:
+        # numeric column
+        return str((row_ind * 7919) % 100003)
+    elif wide and col_ind % 3 == 1:
+        return u"\u6f22\u5b57" * (1 + row_ind % 3)
+    else:
+        return "item {0}".format("x" * ((row_ind * (col_ind + 1)) % 13))
+
+
+def generate_table_text(syntax_name, rows, columns, colspan=False,
+                        wide=False):
+    """Generate unformatted table text with header and data rows.
+
+    Each third column is numeric. With wide every third column holds CJK
+    characters. With colspan every tenth data row starts with a cell
+    spanning two columns, supported only by MultiMarkdown and Textile.
+    """
+    lines = []
+    header = ["Column {0}".format(col_ind) for col_ind in range(columns)]
+    if syntax_name == "Textile":
+        lines.append("|" + "|".join("_. " + h for h in header) + "|")
+    else:
+        lines.append("|" + "|".join(header) + "|")
+        if syntax_name in ("Pandoc", "reStructuredText"):
+            lines.append("+" + "+".join(["---"] * columns) + "+")
+        else:
+            lines.append("|" + "|".join(["---"] * columns) + "|")
+
+    for row_ind in range(rows):
+        cells = [_cell_text(row_ind, col_ind, wide)
+                 for col_ind in range(columns)]
+        if colspan and row_ind % 10 == 0 and columns > 1:
+            if syntax_name == "MultiMarkdown":
+                lines.append("|" + cells[0] + "||" + "|".join(cells[2:]) + "|")
+                continue
+            elif syntax_name == "Textile":
+                cells = ["\\2. " + cells[0]] + cells[2:]
+        lines.append("|" + "|".join(cells) + "|")
+    return "\n".join(lines)
+
+
+def table_cases(syntax_name):
+    cases = [("plain", {}), ("wide", {"wide": True})]
+    if syntax_name in COLSPAN_SYNTAX_NAMES:
+        cases.append(("colspan", {"colspan": True}))
+    return cases
+
+
+def _timed(func, arg):
+    start = timeit.default_timer()
+    func(arg)
+    return timeit.default_timer() - start
+
+
+def measure(func, setup, repeat, memory=True, calibrate=False):
+    """Run func(setup()) repeat times, return timing and peak memory.
+
+    Only func is timed. With calibrate the calibration workload is timed
+    before each run of func, its min is the "calibration" of the result.
+    Peak memory is measured in a separate run when memory is true and
+    tracemalloc is available.
+    """
+    timings = []
+    calibration_timings = []
+    gc_enabled = gc.isenabled()
+    try:
+        for i in range(repeat):
+            arg = setup()
+            gc.disable()
+            if calibrate:
+                calibration_timings.append(
+                    _timed(_calibration_workload, _calibration_cells()))
+            timings.append(_timed(func, arg))
+            if gc_enabled:
+                gc.enable()
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    timings.sort()
+    result = {
+        "min": timings[0],
+        "median": timings[len(timings) // 2],
+        "mean": sum(timings) / len(timings),
+        "repeat": repeat,
+    }
+    if calibrate:
+        result["calibration"] = min(calibration_timings)
+
+    if memory and tracemalloc is not None:
+        arg = setup()
+        tracemalloc.start()
+        try:
+            func(arg)
+            result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def _calibration_workload(cells):
+    # pure Python string work similar to parse and render of a table
+    lines = []
+    for row_ind in range(0, len(cells), 8):
+        row = cells[row_ind:row_ind + 8]
+        line = "|" + "|".join(" " + cell.ljust(12) + " " for cell in row) + "|"
+        lines.append([cell.strip() for cell in line.split("|")[1:-1]])
+    return lines
+
+
+_calibration_cells_cache = []
+
+
+def _calibration_cells():
+    if not _calibration_cells_cache:
+        _calibration_cells_cache.extend(
+            _cell_text(ind // 8, ind % 8, False) for ind in range(8000))
+    return _calibration_cells_cache
+
+
+def _selected(name, only):
+    if only is None:
+        return True
+    for pattern in only:
+        if fnmatch.fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+def benchmark_syntax(syntax_name, rows, columns, repeat, memory=True,
+                     only=None):
+    """Benchmark one syntax, only is a list of benchmark name patterns."""
+    results = {}
+    syntax = table_lib.create_syntax(syntax_name)
+    parser = syntax.table_parser
+    driver = syntax.table_driver
+    pos = tbase.TablePos(rows // 2, 1)
+
+    for case_name, case_options in table_cases(syntax_name):
+        text = generate_table_text(syntax_name, rows, columns, **case_options)
+        prefix = "{0}.{1}.".format(syntax_name, case_name)
+
+        if _selected(prefix + "parse_text", only):
+            results[prefix + "parse_text"] = measure(
+                parser.parse_text, lambda: text, repeat, memory, True)
+        if _selected(prefix + "pack", only):
+            results[prefix + "pack"] = measure(
+                lambda table: table.pack(),
+                lambda: parser.parse_text(text), repeat, memory, True)
+        if _selected(prefix + "render_lines", only):
+            results[prefix + "render_lines"] = measure(
+                lambda table: table.render_lines(),
+                lambda: parser.parse_text(text), repeat, memory, True)
+
+        for operation_name in EDITOR_OPERATIONS:
+            if not _selected(prefix + operation_name, only):
+                continue
+            operation = getattr(driver, operation_name)
+            try:
+                operation(parser.parse_text(text), pos)
+            except tbase.TableException:
+                # not supported by the syntax or by the generated table
+                continue
+            results[prefix + operation_name] = measure(
+                lambda table: operation(table, pos),
+                lambda: parser.parse_text(text), repeat, memory, True)
+    return results
+
+
+def run_benchmarks(syntax_names=None, rows=1000, columns=8, repeat=5,
+                   memory=True, only=None):
+    results = {}
+    for syntax_name in syntax_names or SYNTAX_NAMES:
+        results.update(benchmark_syntax(syntax_name, rows, columns, repeat,
+                                        memory, only))
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"rows": rows, "columns": columns, "repeat": repeat},
+        "results": results,
+    }
+
+
+def format_report(run):
+    lines = ["{0:<60} {1:>12} {2:>12} {3:>12}".format(
+        "benchmark", "min, ms", "median, ms", "peak, KiB")]
+    for name in sorted(run["results"]):
+        result = run["results"][name]
+        peak = result.get("peak_memory")
+        lines.append("{0:<60} {1:>12.3f} {2:>12.3f} {3:>12}".format(
+            name, result["min"] * 1000, result["median"] * 1000,
+            "-" if peak is None else peak // 1024))
+    return "\n".join(lines)
+
+
+class Regression:
+
+    def __init__(self, name, metric, baseline, current, tolerance):
+        self.name = name
+        self.metric = metric
+        self.baseline = baseline
+        self.current = current
+        self.tolerance = tolerance
+
+    def ratio(self):
+        return self.current / self.baseline
+
+    def __str__(self):
+        if self.metric == "peak_memory":
+            values = "{0} KiB -> {1} KiB".format(self.baseline // 1024,
+                                                 self.current // 1024)
+        else:
+            values = "{0:.3f} ms -> {1:.3f} ms".format(self.baseline * 1000,
+                                                       self.current * 1000)
+        return "{0} {1}: {2} ({3:+.0%}, allowed {4:+.0%})".format(
+            self.name, self.metric, values, self.ratio() - 1, self.tolerance)
+
+
+def benchmark_tolerance(baseline, name):
+    """Return allowed relative slowdown for benchmark name.
+
+    Baseline "tolerances" maps benchmark name patterns to tolerance, the
+    first matched pattern in sorted order wins, "default_tolerance" is used
+    otherwise.
+    """
+    tolerances = baseline.get("tolerances", {})
+    for pattern in sorted(tolerances):
+        if fnmatch.fnmatchcase(name, pattern):
+            return tolerances[pattern]
+    return baseline.get("default_tolerance", 1.0)
+
+
+def compare_results(baseline, run):
+    """Compare run with baseline, return (regressions, missing names).
+
+    The min timing is compared, baseline "relative" timing is scaled by the
+    calibration measured together with the benchmark. Differences below baseline "noise_floor"
+    seconds are ignored. Peak memory is compared when both have it.
+    """
+    noise_floor = baseline.get("noise_floor", 0.0005)
+    regressions = []
+    missing = []
+    for name in sorted(baseline["results"]):
+        if name not in run["results"]:
+            missing.append(name)
+            continue
+        expected = baseline["results"][name]
+        actual = run["results"][name]
+        tolerance = benchmark_tolerance(baseline, name)
+        if "relative" in expected:
+            expected_min = expected["relative"] * actual["calibration"]
+        else:
+            expected_min = expected["min"]
+
+        if (actual["min"] > expected_min * (1 + tolerance)
+                and actual["min"] - expected_min > noise_floor):
+            regressions.append(Regression(name, "min", expected_min,
+                                          actual["min"], tolerance))
+        if ("peak_memory" in expected and "peak_memory" in actual
+                and actual["peak_memory"] > expected["peak_memory"] * (1 + tolerance)):
+            regressions.append(Regression(name, "peak_memory",
+                                          expected["peak_memory"],
+                                          actual["peak_memory"], tolerance))
+    return regressions, missing
+
+
+def format_check_report(regressions, missing, count):
+    lines = []
+    if regressions:
+        lines.append("Performance regressions:")
+        for regression in regressions:
+            lines.append("    " + str(regression))
+    if missing:
+        lines.append("Benchmarks missing in the run:")
+        for name in missing:
+            lines.append("    " + name)
+    if not regressions and not missing:
+        lines.append("No performance regressions in {0} benchmarks"
+                     .format(count))
+    return "\n".join(lines)
+
+
+def _load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _dump_json(obj, path):
+    with open(path, "w") as f:
+        json.dump(obj, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _baseline_syntax_names(baseline):
+    return sorted(set(name.split(".")[0] for name in baseline["results"]))
+
+
+def _relative(result):
+    return result["min"] / result["calibration"]
+
+
+def check_baseline(path, retries=2):
+    """Run benchmarks of the baseline and report regressions.
+
+    Regressed benchmarks are measured again up to retries times and the
+    best relative timing is kept, a short load peak doesn't fail the check.
+    """
+    baseline = _load_json(path)
+    params = baseline["params"]
+    only = sorted(baseline["results"])
+    run = run_benchmarks(_baseline_syntax_names(baseline),
+                         params["rows"], params["columns"], params["repeat"],
+                         params.get("memory", False), only)
+    regressions, missing = compare_results(baseline, run)
+    for i in range(retries):
+        only = sorted(set(regression.name for regression in regressions))
+        if not only:
+            break
+        rerun = run_benchmarks(_baseline_syntax_names({"results": only}),
+                               params["rows"], params["columns"],
+                               params["repeat"], params.get("memory", False),
+                               only)
+        for name, result in rerun["results"].items():
+            if _relative(result) < _relative(run["results"][name]):
+                run["results"][name] = result
+        regressions, missing = compare_results(baseline, run)
+    print(format_check_report(regressions, missing, len(baseline["results"])))
+    return 1 if regressions or missing else 0
+
+
+def update_baseline(path, args):
+    """Rewrite baseline results, keep params and tolerances if exist.
+
+    Timings are stored relative to the calibration measured together with
+    each benchmark.
+    """
+    if os.path.exists(path):
+        baseline = _load_json(path)
+        only = sorted(baseline["results"])
+        syntax_names = _baseline_syntax_names(baseline)
+    else:
+        baseline = {
+            "params": {"rows": args.rows, "columns": args.columns,
+                       "repeat": args.repeat, "memory": args.memory},
+            "default_tolerance": 1.0,
+            "noise_floor": 0.0005,
+            "tolerances": {},
+        }
+        only = args.only
+        syntax_names = args.syntax
+    params = baseline["params"]
+    run = run_benchmarks(syntax_names, params["rows"], params["columns"],
+                         params["repeat"], params.get("memory", False), only)
+    baseline["python"] = run["python"]
+    baseline["platform"] = run["platform"]
+    baseline.pop("calibration", None)
+    results = {}
+    for name, result in run["results"].items():
+        results[name] = {"relative": _relative(result)}
+        if "peak_memory" in result:
+            results[name]["peak_memory"] = result["peak_memory"]
+    baseline["results"] = results
+    _dump_json(baseline, path)
+    print(format_report(run))
+    return 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--syntax", action="append", choices=SYNTAX_NAMES,
+                        help="benchmark only given syntax, can be repeated")
+    parser.add_argument("--only", action="append", metavar="PATTERN",
+                        help="benchmark only names matched by the pattern, "
+                        "for example '*.pack', can be repeated")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="don't measure peak memory, it is slow")
+    parser.add_argument("--json", metavar="FILE",
+                        help="write results as JSON into FILE, '-' for stdout")
+    parser.add_argument("--check", metavar="BASELINE",
+                        help="run benchmarks of the baseline file and fail "
+                        "if some of them regressed")
+    parser.add_argument("--update-baseline", metavar="BASELINE",
+                        help="write current results into the baseline file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.check:
+        return check_baseline(args.check)
+    if args.update_baseline:
+        return update_baseline(args.update_baseline, args)
+
+    run = run_benchmarks(args.syntax, args.rows, args.columns, args.repeat,
+                         args.memory, args.only)
+    if args.json == "-":
+        json.dump(run, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        print(format_report(run))
+        if args.json:
+            _dump_json(run, args.json)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -26,15 +26,28 @@
 from __future__ import print_function
 from __future__ import division
 
-import re
-
 try:
     from . import table_base as tbase
+    from . import table_line_parser as tparser
 except ValueError:
     import table_base as tbase
+    import table_line_parser as tparser
+
+
+# (kind, cell pattern) of separator lines, see tparser.LineParserPlus
+LINE_KINDS = [(tparser.Line.SINGLE_SEPARATOR, r"\s*-+\s*"),
+              (tparser.Line.DOUBLE_SEPARATOR, r"\s*=+\s*")]
+
+
+def create_line_parser(align_cell_pattern=None):
+    line_kinds = list(LINE_KINDS)
+    if align_cell_pattern is not None:
+        line_kinds.insert(0, (tparser.Line.ALIGN, align_cell_pattern))
+    return tparser.LineParserPlus("(?:[|])", line_kinds)
 
 
 class SeparatorRow(tbase.Row):
+    __slots__ = ('separator',)
 
     def __init__(self, table, separator='-', size=0):
         tbase.Row.__init__(self, table)
@@ -65,6 +78,8 @@ class SeparatorRow(tbase.Row):
 
 
 class SeparatorColumn(tbase.Column):
+    __slots__ = ('separator',)
+
     def __init__(self, row, separator):
         tbase.Column.__init__(self, row)
         self.separator = separator
@@ -79,6 +94,9 @@ class SeparatorColumn(tbase.Column):
 
 class BorderTableDriver(tbase.TableDriver):
 
+    def create_separator_row(self, table, separator='-'):
+        return SeparatorRow(table, separator)
+
     def editor_insert_single_hline(self, table, table_pos):
         table.rows.insert(table_pos.row_num + 1, SeparatorRow(table, '-'))
         table.pack()
@@ -103,28 +121,33 @@ class BorderTableDriver(tbase.TableDriver):
                tbase.TablePos(table_pos.row_num + 2, 0))
 
 
-class BorderTableParser(tbase.BaseTableParser):
+class GridTableDriver(BorderTableDriver):
+    """
+    Driver of grid tables (reStructuredText, Pandoc), which need a
+    separator above, below and between the rows.
+    """
+    row_separators = True
 
-    def _is_single_row_separator(self, str_cols):
-        if len(str_cols) == 0:
-            return False
-        for col in str_cols:
-            if not re.match(r"^\s*[\-]+\s*$", col):
-                return False
-        return True
+    def arrange_converted_rows(self, table, rows, aligns):
+        header_count = self.converted_header_count(rows)
+        content = [row for row, header in rows
+                   if not row.is_separator() and not row.is_align()]
+        arranged = [SeparatorRow(table, '-')]
+        for ind, row in enumerate(content):
+            arranged.append(row)
+            if ind + 1 == header_count and header_count < len(content):
+                arranged.append(SeparatorRow(table, '='))
+            else:
+                arranged.append(SeparatorRow(table, '-'))
+        return arranged
 
-    def _is_double_row_separator(self, str_cols):
-        if len(str_cols) == 0:
-            return False
-        for col in str_cols:
-            if not re.match(r"^\s*[\=]+\s*$", col):
-                return False
-        return True
+
+class BorderTableParser(tbase.BaseTableParser):
 
     def create_row(self, table, line):
-        if self._is_single_row_separator(line.str_cols()):
+        if line.kind == tparser.Line.SINGLE_SEPARATOR:
             row = SeparatorRow(table, '-')
-        elif self._is_double_row_separator(line.str_cols()):
+        elif line.kind == tparser.Line.DOUBLE_SEPARATOR:
             row = SeparatorRow(table, '=')
         else:
             row = self.create_data_row(table, line)
@@ -42,8 +42,10 @@ class EmacsOrgModeTableSyntax(tbase.TableSyntax):
     def __init__(self, table_configuration):
         tbase.TableSyntax.__init__(self, "Emacs Org mode", table_configuration)
 
+        self.line_parser = tborder.create_line_parser()
         self.table_parser = tborder.BorderTableParser(self)
         self.table_driver = tborder.BorderTableDriver(self)
+        self.formula_support = True
 
         self.hline_out_border = '|'
         self.hline_in_border = '+'
@@ -0,0 +1,425 @@
+# table_fake_sublime.py - in-memory sublime API for headless runs
+
+# Copyright (C) 2012  Free Software Foundation, Inc.
+
+# Author: Valery Kocubinsky
+# Package: SublimeTableEditor
+# Homepage: https://github.com/vkocubinsky/SublimeTableEditor
+
+# This file is part of SublimeTableEditor.
+
+# SublimeTableEditor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# SublimeTableEditor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with SublimeTableEditor.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+In-memory stand-in for the part of sublime and sublime_plugin modules
+used by table_plugin, for benchmarks and tests outside of Sublime Text.
+
+Call install() before importing table_plugin. Every call of the view API
+is counted in api_calls.
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import bisect
+import collections
+import re
+import sys
+import types
+
+
+OP_EQUAL = 0
+OP_NOT_EQUAL = 1
+OP_REGEX_MATCH = 2
+OP_NOT_REGEX_MATCH = 3
+OP_REGEX_CONTAINS = 4
+OP_NOT_REGEX_CONTAINS = 5
+
+# "View.substr" -> count of calls
+api_calls = collections.defaultdict(int)
+
+# last status message
+status = [""]
+
+# callbacks of set_timeout, run by run_timeouts
+_timeouts = []
+
+# command name -> TextCommand or WindowCommand subclass
+_commands = {}
+
+_settings = {}
+
+
+def _counted(name):
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            api_calls[name] += 1
+            return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        return wrapper
+    return decorator
+
+
+def reset_api_calls():
+    api_calls.clear()
+
+
+class Region(object):
+
+    def __init__(self, a, b=None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def size(self):
+        return self.end() - self.begin()
+
+    def empty(self):
+        return self.a == self.b
+
+    def __eq__(self, other):
+        return (isinstance(other, Region)
+                and self.a == other.a and self.b == other.b)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "({0}, {1})".format(self.a, self.b)
+
+
+class Settings(object):
+
+    def __init__(self, values=None):
+        self._values = dict(values or {})
+
+    @_counted("Settings.get")
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    @_counted("Settings.has")
+    def has(self, key):
+        return key in self._values
+
+    @_counted("Settings.set")
+    def set(self, key, value):
+        self._values[key] = value
+
+    @_counted("Settings.erase")
+    def erase(self, key):
+        self._values.pop(key, None)
+
+
+class Selection(object):
+
+    def __init__(self):
+        self._regions = []
+
+    def __iter__(self):
+        return iter(list(self._regions))
+
+    def __len__(self):
+        return len(self._regions)
+
+    def __getitem__(self, index):
+        return self._regions[index]
+
+    def _shift(self, region, length):
+        # move selections after the replaced region as the editor does
+        def shift(point):
+            if point >= region.end():
+                return point + length - region.size()
+            return min(point, region.begin() + length)
+        self._regions = [Region(shift(r.a), shift(r.b)) for r in self._regions]
+
+    @_counted("Selection.clear")
+    def clear(self):
+        self._regions = []
+
+    @_counted("Selection.add")
+    def add(self, region):
+        self._regions.append(region)
+        self._regions.sort(key=lambda r: r.begin())
+
+
+class Edit(object):
+    pass
+
+
+class View(object):
+    """
+    Buffer kept as list of lines, line offsets are recomputed lazily
+    from the first changed line, so edits of ascending lines stay cheap.
+    """
+    _next_id = 1
+
+    def __init__(self, text="", settings=None, window=None,
+                 visible_lines=60):
+        self._id = View._next_id
+        View._next_id += 1
+        self._lines = text.split("\n")
+        self._offsets = [0]
+        self._size = len(text)
+        self._change_count = 0
+        self._settings = Settings(settings)
+        self._sel = Selection()
+        self._window = window
+        self.top_row = 0
+        self.visible_lines = visible_lines
+
+    def _row_offset(self, row):
+        offsets = self._offsets
+        while len(offsets) <= row:
+            prev = len(offsets) - 1
+            offsets.append(offsets[prev] + len(self._lines[prev]) + 1)
+        return offsets[row]
+
+    def _point_rowcol(self, point):
+        point = max(0, min(point, self._size))
+        offsets = self._offsets
+        last = len(offsets) - 1
+        while (last < len(self._lines) - 1
+               and offsets[last] + len(self._lines[last]) < point):
+            last += 1
+            self._row_offset(last)
+        row = bisect.bisect_right(offsets, point) - 1
+        return row, point - offsets[row]
+
+    def _invalidate(self, row):
+        del self._offsets[row + 1:]
+        self._change_count += 1
+
+    def text(self):
+        return "\n".join(self._lines)
+
+    @_counted("View.id")
+    def id(self):
+        return self._id
+
+    @_counted("View.settings")
+    def settings(self):
+        return self._settings
+
+    @_counted("View.sel")
+    def sel(self):
+        return self._sel
+
+    @_counted("View.window")
+    def window(self):
+        return self._window
+
+    @_counted("View.size")
+    def size(self):
+        return self._size
+
+    @_counted("View.change_count")
+    def change_count(self):
+        return self._change_count
+
+    @_counted("View.rowcol")
+    def rowcol(self, point):
+        return self._point_rowcol(point)
+
+    @_counted("View.text_point")
+    def text_point(self, row, col):
+        row = max(0, min(row, len(self._lines) - 1))
+        return self._row_offset(row) + col
+
+    @_counted("View.line")
+    def line(self, x):
+        point = x.begin() if isinstance(x, Region) else x
+        row = self._point_rowcol(point)[0]
+        begin = self._row_offset(row)
+        return Region(begin, begin + len(self._lines[row]))
+
+    @_counted("View.full_line")
+    def full_line(self, x):
+        region = self.line(x)
+        return Region(region.a, min(region.b + 1, self._size))
+
+    @_counted("View.substr")
+    def substr(self, x):
+        if not isinstance(x, Region):
+            row, col = self._point_rowcol(x)
+            return (self._lines[row] + "\n")[col:col + 1]
+        row1, col1 = self._point_rowcol(x.begin())
+        row2, col2 = self._point_rowcol(x.end())
+        if row1 == row2:
+            return self._lines[row1][col1:col2]
+        lines = self._lines[row1:row2 + 1]
+        lines[0] = lines[0][col1:]
+        lines[-1] = lines[-1][:col2]
+        return "\n".join(lines)
+
+    def _replace(self, region, text):
+        row1, col1 = self._point_rowcol(region.begin())
+        row2, col2 = self._point_rowcol(region.end())
+        new_lines = (self._lines[row1][:col1] + text
+                     + self._lines[row2][col2:]).split("\n")
+        self._lines[row1:row2 + 1] = new_lines
+        self._size += len(text) - region.size()
+        self._invalidate(row1)
+        self._sel._shift(region, len(text))
+
+    @_counted("View.replace")
+    def replace(self, edit, region, text):
+        self._replace(region, text)
+
+    @_counted("View.insert")
+    def insert(self, edit, point, text):
+        self._replace(Region(point, point), text)
+        return len(text)
+
+    @_counted("View.erase")
+    def erase(self, edit, region):
+        self._replace(region, "")
+
+    @_counted("View.find")
+    def find(self, pattern, start_point, flags=0):
+        mo = re.compile(pattern).search(self.text(), start_point)
+        if mo is None:
+            return Region(-1, -1)
+        return Region(mo.start(), mo.end())
+
+    @_counted("View.visible_region")
+    def visible_region(self):
+        begin = self.text_point(self.top_row, 0)
+        last_row = min(self.top_row + self.visible_lines,
+                       len(self._lines)) - 1
+        return Region(begin, self.line(self.text_point(last_row, 0)).end())
+
+    @_counted("View.show")
+    def show(self, x, show_surrounds=True):
+        pass
+
+    @_counted("View.run_command")
+    def run_command(self, name, args=None):
+        if name == "append":
+            self._replace(Region(self._size), args["characters"])
+            return
+        command = _commands[name](self)
+        command.run(Edit(), **(args or {}))
+
+
+class Window(object):
+
+    def __init__(self):
+        self.panels = {}
+        self.views = []
+
+    @_counted("Window.create_output_panel")
+    def create_output_panel(self, name):
+        self.panels[name] = View(window=self)
+        return self.panels[name]
+
+    get_output_panel = create_output_panel
+
+    @_counted("Window.new_file")
+    def new_file(self):
+        view = View(window=self)
+        self.views.append(view)
+        return view
+
+    @_counted("Window.show_quick_panel")
+    def show_quick_panel(self, items, on_done, *args, **kwargs):
+        pass
+
+    @_counted("Window.run_command")
+    def run_command(self, name, args=None):
+        if name in _commands:
+            _commands[name](self).run(**(args or {}))
+
+
+@_counted("sublime.status_message")
+def status_message(text):
+    status[0] = text
+
+
+@_counted("sublime.set_timeout")
+def set_timeout(callback, delay):
+    _timeouts.append(callback)
+
+
+def run_timeouts():
+    """Run callbacks of set_timeout including the ones they add."""
+    count = 0
+    while _timeouts:
+        _timeouts.pop(0)()
+        count += 1
+    return count
+
+
+@_counted("sublime.load_settings")
+def load_settings(base_name):
+    return _settings.setdefault(base_name, Settings())
+
+
+@_counted("sublime.save_settings")
+def save_settings(base_name):
+    pass
+
+
+def command_name(cls):
+    """TableEditorNextField -> table_editor_next_field"""
+    name = cls.__name__
+    if name.endswith("Command"):
+        name = name[:-len("Command")]
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
+def register_commands(module):
+    """Register commands of the plugin module for run_command."""
+    for value in vars(module).values():
+        if (isinstance(value, type) and value not in
+                (TextCommand, WindowCommand)
+                and issubclass(value, (TextCommand, WindowCommand))):
+            _commands[command_name(value)] = value
+
+
+class TextCommand(object):
+
+    def __init__(self, view):
+        self.view = view
+
+
+class WindowCommand(object):
+
+    def __init__(self, window):
+        self.window = window
+
+
+class EventListener(object):
+    pass
+
+
+def install():
+    """Put fake sublime and sublime_plugin modules into sys.modules."""
+    sublime = types.ModuleType("sublime")
+    for name in ("OP_EQUAL", "OP_NOT_EQUAL", "OP_REGEX_MATCH",
+                 "OP_NOT_REGEX_MATCH", "OP_REGEX_CONTAINS",
+                 "OP_NOT_REGEX_CONTAINS", "Region", "Settings", "View",
+                 "Window", "status_message", "set_timeout", "load_settings",
+                 "save_settings"):
+        setattr(sublime, name, globals()[name])
+    sublime_plugin = types.ModuleType("sublime_plugin")
+    for name in ("TextCommand", "WindowCommand", "EventListener"):
+        setattr(sublime_plugin, name, globals()[name])
+    sys.modules["sublime"] = sublime
+    sys.modules["sublime_plugin"] = sublime_plugin
+    return sublime, sublime_plugin
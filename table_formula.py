@@ -0,0 +1,473 @@
+# table_formula.py - org mode like spreadsheet formulas for text tables
+
+# Copyright (C) 2012  Free Software Foundation, Inc.
+
+# Author: Valery Kocubinsky
+# Package: SublimeTableEditor
+# Homepage: https://github.com/vkocubinsky/SublimeTableEditor
+
+# This file is part of SublimeTableEditor.
+
+# SublimeTableEditor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# SublimeTableEditor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with SublimeTableEditor.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Spreadsheet formulas in a line bellow the table
+
+    | Item  | Count | Price | Total |
+    |-------+-------+-------+-------|
+    | Apple |     2 |   1.5 |     3 |
+    | Pear  |     3 |     2 |     6 |
+    |-------+-------+-------+-------|
+    | Sum   |       |       |     9 |
+    #+TBLFM: $4=$2*$3::@4$4=vsum(@2$4..@3$4)
+
+Formulas are separated by '::'. A column formula '$N=...' computes every
+not header row of column N, a field formula '@R$N=...' computes one field
+and overrides a column formula. Rows are numbered by data rows starting
+from 1, separator lines are not counted. References are '$N' (column N of
+the computed row) and '@R$N', functions vsum, vmean, vmin, vmax and vcount
+accept ranges '@R1$N1..@R2$N2' and '$N1..$N2'. Empty fields are zero
+in arithmetic and skipped by functions.
+
+Formulas form a dependency graph of fields, after an edit only fields
+which depend on fields changed since the last recalculation are recomputed. The graph is cached with
+the parsed formula line and rebuilt only when rows or columns of the table
+are added or removed.
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import math
+import re
+
+try:
+    from . import table_base as tbase
+except ValueError:
+    import table_base as tbase
+
+
+FORMULA_LINE_PATTERN = r"^\s*#\+TBLFM:(.*)$"
+
+_TOKEN_PATTERN = re.compile(r"""\s*(?:
+    (?P<range>(?:@\d+)?\$\d+\.\.(?:@\d+)?\$\d+)
+    |(?P<ref>(?:@\d+)?\$\d+)
+    |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+    |(?P<name>[a-z]+)
+    |(?P<op>[-+*/(),])
+    )""", re.VERBOSE)
+
+_REF_PATTERN = re.compile(r"^(?:@(\d+))?\$(\d+)$")
+
+
+def _vsum(values):
+    return sum(values)
+
+
+def _vmean(values):
+    tbase.check_condition(len(values) > 0, "vmean of empty range")
+    return sum(values) / len(values)
+
+
+def _vmin(values):
+    tbase.check_condition(len(values) > 0, "vmin of empty range")
+    return min(values)
+
+
+def _vmax(values):
+    tbase.check_condition(len(values) > 0, "vmax of empty range")
+    return max(values)
+
+
+FUNCTIONS = {
+    "vsum": _vsum,
+    "vmean": _vmean,
+    "vmin": _vmin,
+    "vmax": _vmax,
+    "vcount": len,
+}
+
+
+def is_formula_line(text):
+    return re.match(FORMULA_LINE_PATTERN, text) is not None
+
+
+def _parse_ref(text):
+    mo = _REF_PATTERN.match(text)
+    row = int(mo.group(1)) if mo.group(1) else None
+    return (row, int(mo.group(2)))
+
+
+class ExpressionParser:
+    """
+    Recursive descent parser of formula expression into tuples
+    ('number', value), ('ref', row, col), ('range', ref, ref),
+    ('neg', expr), ('binop', op, left, right), ('call', name, args).
+    Row of a reference is None for the computed row.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+
+    def _tokenize(self, text):
+        tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            mo = _TOKEN_PATTERN.match(text, pos)
+            if mo is None or mo.end() == pos:
+                raise tbase.TableException("Invalid formula '{0}' at '{1}'"
+                                           .format(text, text[pos:]))
+            tokens.append((mo.lastgroup, mo.group(mo.lastgroup)))
+            pos = mo.end()
+        return tokens
+
+    def _peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+
+    def _next(self):
+        token = self._peek()
+        self.pos += 1
+        return token
+
+    def _expect(self, value):
+        kind, text = self._next()
+        tbase.check_condition(text == value,
+                              "Invalid formula '{0}', expected '{1}'"
+                              .format(self.text, value))
+
+    def parse(self):
+        expr = self._expression()
+        tbase.check_condition(self.pos == len(self.tokens),
+                              "Invalid formula '{0}'".format(self.text))
+        return expr
+
+    def _expression(self):
+        expr = self._term()
+        while self._peek()[1] in ('+', '-'):
+            op = self._next()[1]
+            expr = ('binop', op, expr, self._term())
+        return expr
+
+    def _term(self):
+        expr = self._factor()
+        while self._peek()[1] in ('*', '/'):
+            op = self._next()[1]
+            expr = ('binop', op, expr, self._factor())
+        return expr
+
+    def _factor(self):
+        kind, text = self._next()
+        if text == '-':
+            return ('neg', self._factor())
+        elif text == '+':
+            return self._factor()
+        elif text == '(':
+            expr = self._expression()
+            self._expect(')')
+            return expr
+        elif kind == 'number':
+            return ('number', float(text))
+        elif kind == 'ref':
+            return ('ref',) + _parse_ref(text)
+        elif kind == 'name':
+            tbase.check_condition(text in FUNCTIONS,
+                                  "Unknown function '{0}'".format(text))
+            self._expect('(')
+            args = [self._argument()]
+            while self._peek()[1] == ',':
+                self._next()
+                args.append(self._argument())
+            self._expect(')')
+            return ('call', text, args)
+        raise tbase.TableException("Invalid formula '{0}'".format(self.text))
+
+    def _argument(self):
+        if self._peek()[0] == 'range':
+            first, last = self._next()[1].split('..')
+            return ('range', _parse_ref(first), _parse_ref(last))
+        return self._expression()
+
+
+class Formula:
+
+    def __init__(self, text):
+        self.text = text.strip()
+        target, sep, expression = self.text.partition('=')
+        tbase.check_condition(sep and _REF_PATTERN.match(target.strip()),
+                              "Invalid formula '{0}'".format(self.text))
+        self.target = _parse_ref(target.strip())
+        self.expression = ExpressionParser(expression).parse()
+
+    def is_column_formula(self):
+        return self.target[0] is None
+
+
+class FormulaCell:
+    """
+    Formula of a field with resolved dependencies,
+    fields are (row, col) tuples numbered from 1.
+    """
+
+    def __init__(self, field, expression):
+        self.field = field
+        self.expression = expression
+        self.dependencies = set()
+        self._collect(expression)
+
+    def _resolve(self, ref):
+        return (ref[0] or self.field[0], ref[1])
+
+    def _range(self, first, last):
+        first = self._resolve(first)
+        last = self._resolve(last)
+        return [(row, col)
+                for row in range(min(first[0], last[0]), max(first[0], last[0]) + 1)
+                for col in range(min(first[1], last[1]), max(first[1], last[1]) + 1)]
+
+    def _collect(self, expr):
+        kind = expr[0]
+        if kind == 'ref':
+            self.dependencies.add(self._resolve(expr[1:]))
+        elif kind == 'range':
+            self.dependencies.update(self._range(expr[1], expr[2]))
+        elif kind == 'neg':
+            self._collect(expr[1])
+        elif kind == 'binop':
+            self._collect(expr[2])
+            self._collect(expr[3])
+        elif kind == 'call':
+            for arg in expr[2]:
+                self._collect(arg)
+
+    def evaluate(self, sheet):
+        return self._evaluate(self.expression, sheet)
+
+    def _evaluate(self, expr, sheet):
+        kind = expr[0]
+        if kind == 'number':
+            return expr[1]
+        elif kind == 'ref':
+            value = sheet.value(self._resolve(expr[1:]))
+            return 0 if value is None else value
+        elif kind == 'neg':
+            return -self._evaluate(expr[1], sheet)
+        elif kind == 'binop':
+            left = self._evaluate(expr[2], sheet)
+            right = self._evaluate(expr[3], sheet)
+            if expr[1] == '+':
+                return left + right
+            elif expr[1] == '-':
+                return left - right
+            elif expr[1] == '*':
+                return left * right
+            tbase.check_condition(right != 0, "Division by zero in field "
+                                  "@{0}${1}".format(*self.field))
+            return left / right
+        elif kind == 'call':
+            values = []
+            for arg in expr[2]:
+                if arg[0] == 'range':
+                    for field in self._range(arg[1], arg[2]):
+                        value = sheet.value(field)
+                        if value is not None:
+                            values.append(value)
+                else:
+                    values.append(self._evaluate(arg, sheet))
+            return FUNCTIONS[expr[1]](values)
+
+
+class Sheet:
+    """
+    Data rows of a table numbered from 1 as a grid of fields.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = [row for row in table.rows if row.is_data()]
+        self.header_count = 0
+        for row in table.rows:
+            if row.is_separator():
+                break
+            if row.is_data():
+                self.header_count += 1
+        else:
+            # no separator, no header
+            self.header_count = 0
+
+    def column(self, field):
+        row, col = field
+        tbase.check_condition(1 <= row <= len(self.rows) and
+                              1 <= col <= len(self.rows[row - 1]),
+                              "Field @{0}${1} is out of table".format(row, col))
+        return self.rows[row - 1][col - 1]
+
+    def value(self, field):
+        text = self.column(field).data.strip()
+        if not text:
+            return None
+        value = tbase.parse_number(text)
+        tbase.check_condition(value is not None,
+                              "Field @{0}${1} is not a number".format(*field))
+        return value
+
+    def texts(self):
+        """Return dict field -> stripped text of every field."""
+        return dict(((row_ind + 1, col_ind + 1), column.data.strip())
+                    for row_ind, row in enumerate(self.rows)
+                    for col_ind, column in enumerate(row.columns))
+
+    def set_value(self, field, value):
+        tbase.check_condition(not (math.isinf(value) or math.isnan(value)),
+                              "Field @{0}${1} is not a finite number"
+                              .format(*field))
+        self.column(field).data = tbase.format_number(value)
+
+
+class TableFormulas:
+    """
+    Formulas of one table and their field dependency graph.
+    The graph is kept until the table shape changes.
+    """
+    CACHE_SIZE = 32
+    _cache = {}
+
+    def __init__(self, text):
+        self.formulas = [Formula(part) for part in text.split('::')
+                         if part.strip()]
+        self._graph = None
+        # field texts after the last recalculation
+        self._texts = None
+
+    @staticmethod
+    def parse_line(text):
+        """Return formulas of the line, the same object for the same line."""
+        formulas = TableFormulas._cache.get(text)
+        if formulas is None:
+            mo = re.match(FORMULA_LINE_PATTERN, text)
+            tbase.check_condition(mo is not None, "Not a formula line")
+            formulas = TableFormulas(mo.group(1))
+            if len(TableFormulas._cache) >= TableFormulas.CACHE_SIZE:
+                TableFormulas._cache.clear()
+            TableFormulas._cache[text] = formulas
+        return formulas
+
+    def graph(self, sheet):
+        """Return cells and dependents of the sheet, rebuilt on shape change."""
+        shape = (sheet.header_count, tuple([len(row) for row in sheet.rows]))
+        if self._graph is None or self._graph[0] != shape:
+            cells = self.cells(sheet)
+            self._graph = (shape, cells, self._dependents(cells))
+            self._texts = None
+        return self._graph[1], self._graph[2]
+
+    def cells(self, sheet):
+        """Return dict field -> FormulaCell."""
+        cells = {}
+        for formula in self.formulas:
+            if formula.is_column_formula():
+                col = formula.target[1]
+                for row in range(sheet.header_count + 1, len(sheet.rows) + 1):
+                    field = (row, col)
+                    if field not in cells:
+                        cells[field] = FormulaCell(field, formula.expression)
+        for formula in self.formulas:
+            if not formula.is_column_formula():
+                sheet.column(formula.target)
+                cells[formula.target] = FormulaCell(formula.target,
+                                                    formula.expression)
+        return cells
+
+    def _dependents(self, cells):
+        dependents = {}
+        for cell in cells.values():
+            for field in cell.dependencies:
+                dependents.setdefault(field, []).append(cell.field)
+        return dependents
+
+    def _downstream(self, dependents, changed):
+        affected = set()
+        stack = list(changed)
+        while stack:
+            for field in dependents.get(stack.pop(), ()):
+                if field not in affected:
+                    affected.add(field)
+                    stack.append(field)
+        return affected
+
+    def _order(self, cells, fields):
+        """Topological order of fields, dependencies first."""
+        order = []
+        state = {}
+        for start in sorted(fields):
+            if start in state:
+                continue
+            stack = [(start, iter(sorted(cells[start].dependencies)))]
+            state[start] = 1
+            while stack:
+                field, dependencies = stack[-1]
+                for dependency in dependencies:
+                    if dependency not in fields:
+                        continue
+                    if state.get(dependency) == 1:
+                        raise tbase.TableException(
+                            "Circular reference in field @{0}${1}"
+                            .format(*dependency))
+                    if dependency not in state:
+                        state[dependency] = 1
+                        stack.append((dependency,
+                                      iter(sorted(cells[dependency].dependencies))))
+                        break
+                else:
+                    stack.pop()
+                    state[field] = 2
+                    order.append(field)
+        return order
+
+    def recalculate(self, table, changed=None):
+        """
+        Recompute formula fields of the table. If changed fields are given
+        only fields which depend on them or on fields changed since the
+        last recalculation are recomputed, without previous recalculation
+        of the same table shape all fields are recomputed.
+        Return count of recomputed fields.
+        """
+        sheet = Sheet(table)
+        cells, dependents = self.graph(sheet)
+        texts = sheet.texts()
+        if changed is None or self._texts is None:
+            fields = set(cells)
+        else:
+            changed = set(changed)
+            changed.update(field for field, text in texts.items()
+                           if self._texts.get(field) != text)
+            # edited formula fields are computed again
+            fields = self._downstream(dependents, changed)
+            fields.update(field for field in changed if field in cells)
+        self._texts = None
+        for field in self._order(cells, fields):
+            sheet.set_value(field, cells[field].evaluate(sheet))
+        self._texts = sheet.texts()
+        return len(fields)
+
+    def data_field(self, table, table_pos):
+        """Field of the table position or None if it is not a data row."""
+        row = table[table_pos.row_num]
+        if not row.is_data():
+            return None
+        row_num = sum([1 for r in table.rows[:table_pos.row_num] if r.is_data()])
+        return (row_num + 1, table_pos.field_num + 1)
@@ -24,24 +24,44 @@
 from __future__ import print_function
 from __future__ import division
 
-import csv
-
 try:
     from . import table_base as tbase
-    from . import table_simple_syntax as simple
-    from . import table_emacs_org_mode_syntax as emacs
-    from . import table_pandoc_syntax as pandoc
-    from . import table_multi_markdown_syntax as markdown
-    from . import table_re_structured_text_syntax as re_structured_text
-    from . import table_textile_syntax as textile
 except ValueError:
     import table_base as tbase
-    import table_simple_syntax as simple
-    import table_emacs_org_mode_syntax as emacs
-    import table_pandoc_syntax as pandoc
-    import table_multi_markdown_syntax as markdown
-    import table_re_structured_text_syntax as re_structured_text
-    import table_textile_syntax as textile
+
+
+_syntax_modules = {
+    "Simple": "table_simple_syntax",
+    "EmacsOrgMode": "table_emacs_org_mode_syntax",
+    "Pandoc": "table_pandoc_syntax",
+    "MultiMarkdown": "table_multi_markdown_syntax",
+    "reStructuredText": "table_re_structured_text_syntax",
+    "Textile": "table_textile_syntax"
+}
+
+_syntax_factories = {}
+
+
+def _import_syntax_module(module_name):
+    try:
+        package = __import__('', globals(), None, [module_name], 1)
+        return getattr(package, module_name)
+    except ValueError:
+        return __import__(module_name)
+
+
+def register_syntax(syntax_name, factory):
+    """Register table syntax.
+
+    factory is a callable which accepts table configuration (or None)
+    and returns a TableSyntax instance. Registered syntax replaces a
+    built-in syntax with the same name.
+    """
+    _syntax_factories[syntax_name] = factory
+
+
+def syntax_names():
+    return sorted(set(_syntax_modules) | set(_syntax_factories))
 
 
 def simple_syntax(table_configuration=None):
@@ -69,20 +89,95 @@ def textile_syntax(table_configuration=None):
 
 
 def create_syntax(syntax_name, table_configuration=None):
-    modules = {
-        "Simple": simple,
-        "EmacsOrgMode": emacs,
-        "Pandoc": pandoc,
-        "MultiMarkdown": markdown,
-        "reStructuredText": re_structured_text,
-        "Textile": textile
-    }
-
-    if syntax_name in modules:
-        module = modules[syntax_name]
-    else:
-        raise ValueError("Syntax {syntax_name} doesn't supported"
-                         .format(syntax_name=syntax_name))
-
-    syntax = module.create_syntax(table_configuration)
+    factory = _syntax_factories.get(syntax_name)
+    if factory is None:
+        if syntax_name in _syntax_modules:
+            module = _import_syntax_module(_syntax_modules[syntax_name])
+            factory = module.create_syntax
+            _syntax_factories[syntax_name] = factory
+        else:
+            raise ValueError("Syntax {syntax_name} doesn't supported"
+                             .format(syntax_name=syntax_name))
+
+    syntax = factory(table_configuration)
     return syntax
+
+
+def format_stream(syntax, input_stream, output_stream):
+    """Copy input_stream into output_stream with every table formatted.
+
+    Streams are read and written line by line, memory is proportional
+    to the largest table rather than the whole text.
+    """
+    for line in syntax.table_parser.format_lines(input_stream):
+        output_stream.write(line)
+
+
+def convert_table(table, syntax):
+    """Convert table parsed by one syntax into a new table of syntax.
+
+    Every row is mapped through the driver hooks create_content_row,
+    create_separator_row and create_align_row of the target syntax, then
+    arrange_converted_rows of the target driver places separators the
+    target syntax requires. Tables with rowspan can't be converted.
+    """
+    source_driver = table.syntax.table_driver
+    driver = syntax.table_driver
+    aligns = source_driver.column_aligns(table) or _cell_aligns(table)
+
+    target = tbase.TextTable(syntax)
+    target.prefix = table.prefix
+    rows = []
+    for row in table.rows:
+        rows.extend(_convert_row(row, target, aligns))
+    target.rows = driver.arrange_converted_rows(
+        target, [(row, header) for row, header in rows if row is not None],
+        aligns)
+    target.pack()
+    return target
+
+
+def _cell_aligns(table):
+    """
+    Most common alignment given by cells of each column in not header
+    data rows, rows with colspan are skipped.
+    """
+    source_driver = table.syntax.table_driver
+    columns_aligns = []
+    for row in table.rows:
+        if (not row.is_data()
+                or any(column.header or column.colspan > 1
+                       for column in row.columns)):
+            continue
+        columns = [column for column in row.columns if not column.pseudo()]
+        for ind, column in enumerate(columns):
+            if ind == len(columns_aligns):
+                columns_aligns.append([])
+            columns_aligns[ind].append(source_driver.cell_align(column))
+    return [tbase.common_align(aligns) for aligns in columns_aligns]
+
+
+def _convert_row(row, target, aligns):
+    """List of (target row or None, header) for the source row."""
+    source_driver = row.syntax.table_driver
+    driver = target.syntax.table_driver
+    if row.is_align():
+        converted = [(driver.create_align_row(target, aligns), False)]
+        if row.is_header_separator():
+            converted.append((driver.create_separator_row(target), False))
+        return converted
+    if row.is_separator():
+        return [(driver.create_separator_row(target), False)]
+
+    columns = [column for column in row.columns if not column.pseudo()]
+    header = row.is_header_separator()
+    cells = []
+    for ind, column in enumerate(columns):
+        tbase.check_condition(column.rowspan == 1,
+                              "Conversion of rowspan is not supported")
+        header = header or bool(column.header)
+        align = source_driver.cell_align(column)
+        if align is None and ind < len(aligns):
+            align = aligns[ind]
+        cells.append((column.data.strip(), column.colspan, align))
+    return [(driver.create_content_row(target, cells, header), header)]
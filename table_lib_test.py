@@ -21,15 +21,22 @@
 # You should have received a copy of the GNU General Public License
 # along with SublimeTableEditor.  If not, see <http://www.gnu.org/licenses/>.
 
+import sys
 import unittest
 import difflib
+import io
+import re
 
 try:
     from . import table_lib
     from . import table_base as tbase
+    from . import table_formula
+    from . import table_textile_syntax
 except ValueError:
     import table_lib
     import table_base as tbase
+    import table_formula
+    import table_textile_syntax
 
 
 class BaseTableTest(unittest.TestCase):
@@ -363,6 +370,315 @@ class SimpleSyntaxTest(BaseTableTest):
         self.assertEqual(tbase.TablePos(1, 0), pos)
         self.assert_table_equals(expected, t.render())
 
+    def testBatch(self):
+        t = self.syntax.table_parser.parse_text("""
+| a | b | c |
+|---|---|---|
+| 1 | 2 | 3 |
+""".strip())
+        packs = []
+        pack = t.pack
+        t.pack = lambda: packs.append(pack())
+        with t.batch():
+            t.insert_empty_rows(3, 2)
+            t.swap_columns(0, 2)
+            with t.batch():
+                t.delete_rows(4, 5)
+                t.insert_empty_columns(1, 2)
+            t.delete_columns(1, 2)
+            self.assertEqual([], packs)
+        self.assertEqual(1, len(packs))
+        self.assert_table_equals("""
+| c |   | b | a |
+|---|---|---|---|
+| 3 |   | 2 | 1 |
+|   |   |   |   |
+""".strip(), t.render())
+
+    def testPackEditedRow(self):
+        aligned = """
+|  Name | Gender | Age |
+|-------|--------|-----|
+| Alisa | F      |  21 |
+{0}
+| Alex  | M      |   7 |
+""".strip()
+        cases = [("| Bob | M | 3 |", True),
+                 ("|Bob|M|  3   |", True),
+                 ("| Bob | M | 3 | x", False),
+                 ("| Bob |", True),
+                 ("| Alexander | M | 3 |", False),
+                 ("| Bob | M | 3000 |", False),
+                 ("| Bob | M | x |", False),
+                 ("| Bob | M | 3 | 4 |", False)]
+        for edited, fast in cases:
+            text = aligned.format(edited)
+            expected = self.syntax.table_parser.parse_text(text).render()
+            t = self.syntax.table_parser.parse_text(text, pack=False)
+            self.assertEqual(fast, t.pack_edited_row(text.splitlines(), 3))
+            if not fast:
+                t.pack()
+            self.assert_table_equals(expected, t.render())
+
+        # only the widest cell of the column shrinks
+        text = aligned.format("| Bob | M | 3 |").replace("Alisa", "Ann  ")
+        t = self.syntax.table_parser.parse_text(text, pack=False)
+        self.assertFalse(t.pack_edited_row(text.splitlines(), 2))
+        # other row is not aligned
+        text = aligned.format("| Bob | M | 3 |").replace("|  21 |", "| 21  |")
+        t = self.syntax.table_parser.parse_text(text, pack=False)
+        self.assertFalse(t.pack_edited_row(text.splitlines(), 3))
+        # two misaligned rows in one column
+        text = """
+|  Name | Age |
+|-------|-----|
+| Alisa |  21 |
+| Bo    |  22 |
+|    Al |  23 |
+| Bob | 3 |
+|  Alex |   7 |
+""".strip()
+        expected = self.syntax.table_parser.parse_text(text).render()
+        t = self.syntax.table_parser.parse_text(text, pack=False)
+        self.assertFalse(t.pack_edited_row(text.splitlines(), 5))
+        t.pack()
+        self.assert_table_equals(expected, t.render())
+        self.assertTrue("| Al    |  23 |" in expected)
+        # disabled in configuration
+        text = aligned.format("| Bob | M | 3 |")
+        t = self.syntax.table_parser.parse_text(text, pack=False)
+        t.syntax.table_configuration.fast_align = False
+        self.assertFalse(t.pack_edited_row(text.splitlines(), 3))
+
+    def testLineKind(self):
+        cases = [("| a | b |", "data"),
+                 ("|---|---|", "single"),
+                 ("+---+---+", "single"),
+                 ("| -- | ---", "single"),
+                 ("|===|===|", "double"),
+                 ("| < | > | # |", "align"),
+                 ("|---|===|", "data"),
+                 ("|---||", "data"),
+                 ("| <> |", "data"),
+                 ("|", "data")]
+        for text, kind in cases:
+            self.assertEqual(kind, self.syntax.line_parser.parse(text).kind,
+                             text)
+
+    def testFormatStream(self):
+        text = (u"Report\n\n|a|b|\n|-|-|\n|1|22|\nnext\r\n"
+                u"  |x|\r\n  |yy|\r\n\n|last|")
+        expected = (u"Report\n\n| a | b  |\n|---|----|\n| 1 | 22 |\nnext\r\n"
+                    u"  | x  |\r\n  | yy |\r\n\n| last |")
+        output = io.StringIO()
+        table_lib.format_stream(self.syntax, io.StringIO(text, newline=""),
+                                output)
+        self.assert_table_equals(expected, output.getvalue())
+
+    def testRenderLinesRange(self):
+        text = """
+| a | b |
+|---|---|
+| 1 | 2 |
+|3|4|
+| 5 | 6 |
+""".strip()
+        t = self.syntax.table_parser.parse_text(text)
+        self.assertEqual(["| 1 | 2 |", "| 3 | 4 |"], t.render_lines(2, 4))
+        t = self.syntax.table_parser.parse_text(text, pack=False)
+        self.assertTrue(t.pack_edited_row(text.splitlines(), 3))
+        self.assertEqual(["| 3 | 4 |", "| 5 | 6 |"], t.render_lines(3))
+        self.assertEqual(["| a | b |"], t.render_lines(0, 1))
+
+    def testEditorRepeat(self):
+        t = self.syntax.table_parser.parse_text("""
+| a | b | c |
+|---|---|---|
+| 1 | 2 | 3 |
+""".strip())
+        d = self.syntax.table_driver
+        msg, pos = d.editor_repeat(d.editor_move_column_right, t,
+                                   tbase.TablePos(0, 0), 5)
+        self.assertEqual(tbase.TablePos(0, 2), pos)
+        msg, pos = d.editor_repeat(d.editor_insert_row, t,
+                                   tbase.TablePos(2, 0), 2)
+        self.assertEqual(tbase.TablePos(2, 0), pos)
+        self.assert_table_equals("""
+| b | c | a |
+|---|---|---|
+|   |   |   |
+|   |   |   |
+| 2 | 3 | 1 |
+""".strip(), t.render())
+        msg, pos = d.editor_repeat(d.editor_kill_row, t,
+                                   tbase.TablePos(1, 0), 3)
+        self.assert_table_equals("""
+| b | c | a |
+| 2 | 3 | 1 |
+""".strip(), t.render())
+        self.assertRaises(tbase.TableException, d.editor_repeat,
+                          d.editor_move_row_up, t, tbase.TablePos(0, 0), 2)
+
+    def testRangeOperations(self):
+        t = self.syntax.table_parser.parse_text("""
+| a | b | c | d |
+|---|---|---|---|
+| 1 | 2 | 3 | 4 |
+| 5 | 6 | 7 | 8 |
+""".strip())
+        d = self.syntax.table_driver
+        msg, pos = d.editor_delete_columns(t, tbase.TablePos(3, 2),
+                                           tbase.TablePos(2, 1))
+        self.assertEqual("2 columns deleted", msg)
+        self.assertEqual(tbase.TablePos(3, 1), pos)
+        msg, pos = d.editor_insert_rows(t, tbase.TablePos(2, 0),
+                                        tbase.TablePos(3, 0))
+        self.assertEqual(tbase.TablePos(2, 0), pos)
+        msg, pos = d.editor_insert_columns(t, tbase.TablePos(0, 1),
+                                           tbase.TablePos(0, 1))
+        self.assert_table_equals("""
+| a |   | d |
+|---|---|---|
+|   |   |   |
+|   |   |   |
+| 1 |   | 4 |
+| 5 |   | 8 |
+""".strip(), t.render())
+        msg, pos = d.editor_kill_rows(t, tbase.TablePos(3, 0),
+                                      tbase.TablePos(5, 0))
+        self.assertEqual("3 rows deleted", msg)
+        self.assertEqual(tbase.TablePos(2, 0), pos)
+        self.assertEqual(3, len(t))
+
+    def testSortRows(self):
+        t = self.syntax.table_parser.parse_text("""
+| Name  | Age |
+|-------|-----|
+| bob   | 10  |
+| Alice | 9   |
+| carol |     |
+|-------|-----|
+| dave  | 30  |
+| eve   | 4   |
+""".strip())
+        t.sort_rows(1)
+        self.assert_table_equals("""
+|  Name | Age |
+|-------|-----|
+| Alice |   9 |
+| bob   |  10 |
+| carol |     |
+|-------|-----|
+| eve   |   4 |
+| dave  |  30 |
+""".strip(), t.render())
+        d = self.syntax.table_driver
+        msg, pos = d.editor_sort(t, tbase.TablePos(3, 0), reverse=True)
+        self.assertEqual(tbase.TablePos(3, 0), pos)
+        self.assert_table_equals("""
+|  Name | Age |
+|-------|-----|
+| carol |     |
+| bob   |  10 |
+| Alice |   9 |
+|-------|-----|
+| eve   |   4 |
+| dave  |  30 |
+""".strip(), t.render())
+        # empty values are last in reverse order too
+        t.sort_rows(1, reverse=True)
+        self.assert_table_equals("""
+|  Name | Age |
+|-------|-----|
+| bob   |  10 |
+| Alice |   9 |
+| carol |     |
+|-------|-----|
+| dave  |  30 |
+| eve   |   4 |
+""".strip(), t.render())
+        t[4][0].data = ""
+        t.sort_rows(0, reverse=True)
+        self.assertEqual(["bob", "Alice", ""],
+                         [t[ind][0].data.strip() for ind in range(2, 5)])
+
+    def testColumnStats(self):
+        t = self.syntax.table_parser.parse_text("""
+| Name  | Age |
+|-------|-----|
+| Alice | 9   |
+| Bob   | n/a |
+| Carol |     |
+| Dave  | 30  |
+""".strip())
+        stats = t.column_stats(1)
+        self.assertEqual((2, 1, 1), (stats.count, stats.text, stats.empty))
+        self.assertEqual((39, 9, 30, 19.5),
+                         (stats.sum, stats.min, stats.max, stats.mean()))
+        d = self.syntax.table_driver
+        msg, pos = d.editor_column_stats(t, tbase.TablePos(2, 1), True)
+        self.assertEqual("Column 2: count=2 sum=39 min=9 max=30 mean=19.5", msg)
+        self.assert_table_equals("""
+|  Name | Age |
+|-------|-----|
+| Alice | 9   |
+| Bob   | n/a |
+| Carol |     |
+| Dave  | 30  |
+|-------|-----|
+| Total | 39  |
+""".strip(), t.render())
+
+    def testColumnStatsNotFinite(self):
+        t = self.syntax.table_parser.parse_text("""
+| Name  | Age |
+|-------|-----|
+| Alice | inf |
+| Bob   | nan |
+| Dave  | 30  |
+""".strip())
+        stats = t.column_stats(1)
+        self.assertEqual((1, 2, 0), (stats.count, stats.text, stats.empty))
+        d = self.syntax.table_driver
+        msg, pos = d.editor_column_stats(t, tbase.TablePos(2, 1))
+        self.assertEqual("Column 2: count=1 sum=30 min=30 max=30 mean=30", msg)
+        self.assertEqual("inf", tbase.format_number(float("inf")))
+        self.assertEqual("nan", tbase.format_number(float("nan")))
+
+    def testTranspose(self):
+        t = self.syntax.table_parser.parse_text("""
+| a | b | c |
+|---|
+| 1 | 2 | 3 |
+| 4 | 5 |
+""".strip())
+        msg, pos = self.syntax.table_driver.editor_transpose(
+            t, tbase.TablePos(2, 1))
+        self.assertEqual(tbase.TablePos(2, 1), pos)
+        self.assert_table_equals("""
+| a | 1 | 4 |
+|---|---|---|
+| b | 2 | 5 |
+| c | 3 |   |
+""".strip(), t.render())
+
+        # separators between content rows separate transposed rows
+        t = self.syntax.table_parser.parse_text("""
+| a | b | c |
+|---|---|---|
+| 1 | 2 | 3 |
+|---|---|---|
+| 4 | 5 | 6 |
+""".strip())
+        t.transpose()
+        self.assert_table_equals("""
+| a | 1 | 4 |
+|---|---|---|
+| b | 2 | 5 |
+|---|---|---|
+| c | 3 | 6 |
+""".strip(), t.render())
+
     def testParseCsv(self):
         csv_text = """
 a,b,c
@@ -378,6 +694,92 @@ a,b,c
         t = d.parse_csv(csv_text)
         self.assert_table_equals(expected, t.render())
 
+    def testRenderCsvLines(self):
+        csv_text = """
+name,age,comment
+Anna,20,"quoted, text"
+Alexander,27
+Bob,,long comment here
+        """.strip()
+
+        expected = """
+| name      | age | comment           |
+| Anna      | 20  | quoted, text      |
+| Alexander | 27  |                   |
+| Bob       |     | long comment here |
+        """.strip()
+
+        d = self.syntax.table_driver
+        self.assert_table_equals(expected, "\n".join(d.render_csv_lines(csv_text)))
+        self.assert_table_equals(expected, d.parse_csv(csv_text).render())
+
+    def testParseCsvWithDialect(self):
+        csv_text = """
+name;age
+'Anna; Maria';20
+Alexander;27
+        """.strip()
+
+        expected = """
+|     name    | age |
+|-------------|-----|
+| Anna; Maria |  20 |
+| Alexander   |  27 |
+        """.strip()
+
+        d = self.syntax.table_driver
+        lines = d.render_csv_lines(csv_text, delimiter=';', quotechar="'",
+                                   has_header=True)
+        self.assert_table_equals(expected, "\n".join(lines))
+        t = d.parse_csv(csv_text, delimiter=';', quotechar="'",
+                        has_header=True)
+        self.assert_table_equals(expected, t.render())
+
+    def testParseCsvNotSniffed(self):
+        csv_text = "name\n'Anna, Maria'\nBob"
+        d = self.syntax.table_driver
+        self.assert_table_equals("""
+| name          |
+| 'Anna, Maria' |
+| Bob           |
+""".strip(), "\n".join(d.render_csv_lines(csv_text)))
+        self.assertEqual("CSV dialect is not detected, a line is a row",
+                         d.csv_fallback)
+        # requested quotechar is used by the fallback dialect
+        expected = """
+| name        |
+| Anna, Maria |
+| Bob         |
+""".strip()
+        self.assert_table_equals(expected, "\n".join(
+            d.render_csv_lines(csv_text, quotechar="'")))
+        self.assert_table_equals(expected,
+                                 d.parse_csv(csv_text, quotechar="'").render())
+        self.assertEqual("CSV dialect is not detected, used excel dialect",
+                         d.csv_fallback)
+        d.parse_csv("a,b\n1,2")
+        self.assertEqual(None, d.csv_fallback)
+
+    def testWriteCsv(self):
+        text = """
+|     Name    |    Gender   |      Age      |
+|-------------|-------------|---------------|
+| Alisa       | F           |            21 |
+| Alex, Jr    | M           |            22 |
+        """.strip()
+
+        expected = """
+Name,Gender,Age
+Alisa,F,21
+"Alex, Jr",M,22
+        """.strip()
+
+        t = self.syntax.table_parser.parse_text(text)
+        f = io.StringIO()
+        count = self.syntax.table_driver.write_csv(t, f)
+        self.assertEqual(3, count)
+        self.assert_table_equals(expected, f.getvalue().strip())
+
 
 class TextileSyntaxTest(BaseTableTest):
 
@@ -453,6 +855,76 @@ class TextileSyntaxTest(BaseTableTest):
         formatted = t.render()
         self.assert_table_equals(expected, formatted)
 
+    def testColumnSlots(self):
+        t = self.syntax.table_parser.parse_text(r"""
+|\2. spans two cols |
+| col 1 | col 2 |
+""".strip())
+        self.assertEqual(1, len(t[0][0].pseudo_columns))
+        self.assertTrue(t[0][1].pseudo_columns is t[1][0].pseudo_columns)
+        self.assertTrue(t[1][0].table is t)
+        self.assertTrue(t[1][0].syntax is self.syntax)
+        self.assertFalse(hasattr(t[0][0], '__dict__'))
+        self.assertFalse(hasattr(t[1][1], '__dict__'))
+        self.assertFalse(hasattr(t[1], '__dict__'))
+
+    def testDeleteColspanColumn(self):
+        t = self.syntax.table_parser.parse_text(r"""
+|\2. spans two cols |
+| col 1 | col 2 |
+""".strip())
+        self.assertRaises(tbase.TableException, t.delete_column, 1)
+
+    def testCellAttributes(self):
+        parse = table_textile_syntax.parse_cell_attr
+        self.assertEqual(("_.", "header"), parse(" _. header "))
+        self.assertEqual(("{color:red}<\\2/3.", "x"),
+                         parse("{color:red}<\\2/3. x"))
+        self.assertEqual(("(a).", "(b). x"), parse("(a). (b). x"))
+        self.assertEqual(("{a}.}.", "x"), parse("{a}.}. x"))
+        self.assertEqual(None, parse("{a}.} . x"))
+        self.assertEqual(None, parse("3.5 kg"))
+        self.assertEqual(None, parse(". x"))
+        self.assertEqual(None, parse("_.x"))
+
+    def testCellAttributesBacktracking(self):
+        # texts with exponential backtracking for the former regular expression
+        parse = table_textile_syntax.parse_cell_attr
+        pattern = re.compile(r"\s*((?:[_<>=~^:-]|[/\\]\d+|\{.*?\}|\(.*?\))+\.)\s+(.*)$")
+
+        def texts(n):
+            return ["{}" * n + "x", "{.}" * n + "x", "(" * 2 * n,
+                    "({" * n + "})" * n, "/1" * n + "x", "{" + "}" * 2 * n + "x",
+                    "_" * 2 * n + ". x", "{.}" * n + ". x"]
+
+        for text in texts(8):
+            mo = pattern.match(text)
+            self.assertEqual(mo and mo.groups(), parse(text))
+        expected = [None] * 6 + [("_" * 10000 + ".", "x"),
+                                 ("{.}" * 5000 + ".", "x")]
+        self.assertEqual(expected, [parse(text) for text in texts(5000)])
+        t = self.syntax.table_parser.parse_text(
+            "\n".join("|" + text + "|" for text in texts(5000)))
+        self.assertEqual("_" * 10000 + ".", t[6][0].attr)
+
+    def testWriteCsvColspan(self):
+        text = r"""
+|_. header 1 |_. header 2 |
+|\2. spans two cols      |
+| col 1      | col 2      |
+""".strip()
+
+        expected = """
+header 1,header 2
+spans two cols,
+col 1,col 2
+""".strip()
+
+        t = self.syntax.table_parser.parse_text(text)
+        f = io.StringIO()
+        self.syntax.table_driver.write_csv(t, f)
+        self.assert_table_equals(expected, f.getvalue().strip())
+
     def testRowspan(self):
         unformatted = r"""
 |/3. spans 3 rows | a |
@@ -470,6 +942,13 @@ class TextileSyntaxTest(BaseTableTest):
         formatted = t.render()
         self.assert_table_equals(expected, formatted)
 
+    def testTransposeColspan(self):
+        t = self.syntax.table_parser.parse_text(r"""
+|\2. spans two cols |
+| col 1 | col 2 |
+""".strip())
+        self.assertRaises(tbase.TableException, t.transpose)
+
     def testIntelligentFormatting(self):
         self.syntax.intelligent_formatting = True
         unformatted = r"""
@@ -549,6 +1028,46 @@ class MultiMarkdownSyntaxTest(BaseTableTest):
         formatted = t.render()
         self.assert_table_equals(expected, formatted)
 
+    def testLineKind(self):
+        cases = [("| a | b |", "data"),
+                 ("| :-- | --: | :-: |", "align"),
+                 ("|---|---|", "align"),
+                 ("| :---: |||", "align"),
+                 ("|---||---|", "data"),
+                 ("| :-:-: |", "data"),
+                 ("|===|===|", "data")]
+        for text, kind in cases:
+            self.assertEqual(kind, self.syntax.line_parser.parse(text).kind,
+                             text)
+
+    def testTranspose(self):
+        t = self.syntax.table_parser.parse_text("""
+| a | b |
+|:-:|:-:|
+| 1 | 2 |
+| 3 | 4 |
+""".strip())
+        t.transpose()
+        self.assert_table_equals("""
+|  a  |  1  |  3  |
+| :-: | :-: | :-: |
+|  b  |  2  |  4  |
+""".strip(), t.render())
+
+        # different alignments, the most common one is kept
+        t = self.syntax.table_parser.parse_text("""
+| a | b | c |
+|:--|--:|--:|
+| 1 | 2 | 3 |
+""".strip())
+        t.transpose()
+        self.assert_table_equals("""
+|  a  |  1  |
+| --: | --: |
+|   b |   2 |
+|   c |   3 |
+""".strip(), t.render())
+
     def testColspan(self):
                 unformatted = """\
     |                 |          Grouping           ||
@@ -612,6 +1131,41 @@ class ReStructuredTextSyntaxTest(BaseTableTest):
         formatted = t.render()
         self.assert_table_equals(expected, formatted)
 
+    def testTranspose(self):
+        t = self.syntax.table_parser.parse_text("""
++---+---+
+| a | b |
++===+===+
+| 1 | 2 |
++---+---+
+""".strip())
+        t.transpose()
+        self.assert_table_equals("""
++---+---+
+| a | 1 |
++===+===+
+| b | 2 |
++---+---+
+""".strip(), t.render())
+
+        t = self.syntax.table_parser.parse_text("""
++---+---+---+
+| a | b | c |
++===+===+===+
+| 1 | 2 | 3 |
++---+---+---+
+""".strip())
+        t.transpose()
+        self.assert_table_equals("""
++---+---+
+| a | 1 |
++===+===+
+| b | 2 |
++---+---+
+| c | 3 |
++---+---+
+""".strip(), t.render())
+
     def testDetectHeader(self):
         unformatted = """\
 +---------+
@@ -636,5 +1190,276 @@ class ReStructuredTextSyntaxTest(BaseTableTest):
         self.assert_table_equals(expected, formatted)
 
 
+class FormulaTest(BaseTableTest):
+
+    def setUp(self):
+        self.syntax = table_lib.emacs_org_mode_syntax()
+        self.text = """
+| Item  | Count | Price | Total |
+|-------+-------+-------+-------|
+| Apple |     2 |   1.5 |       |
+| Pear  |     3 |     2 |       |
+|-------+-------+-------+-------|
+| Sum   |       |       |       |
+""".strip()
+        self.formulas = table_formula.TableFormulas.parse_line(
+            "#+TBLFM: $4=$2*$3::@4$4=vsum(@2$4..@3$4)::@4$2=vcount(@2$2..@3$2)")
+
+    def testRecalculate(self):
+        t = self.syntax.table_parser.parse_text(self.text)
+        self.assertEqual(4, self.formulas.recalculate(t))
+        t.pack()
+        self.assert_table_equals("""
+|  Item | Count | Price | Total |
+|-------+-------+-------+-------|
+| Apple |     2 |   1.5 |     3 |
+| Pear  |     3 |     2 |     6 |
+|-------+-------+-------+-------|
+| Sum   |     2 |       |     9 |
+""".strip(), t.render())
+
+    def testRecalculateDownstream(self):
+        t = self.syntax.table_parser.parse_text(self.text)
+        self.formulas.recalculate(t)
+        t[3][1].data = "10"
+        self.assertEqual(3, self.formulas.recalculate(t, [(3, 2)]))
+        self.assertEqual("20", t[3][3].data)
+        self.assertEqual("23", t[5][3].data)
+        self.assertEqual("2", t[5][1].data)
+        self.assertEqual((3, 2), self.formulas.data_field(t, tbase.TablePos(3, 1)))
+        self.assertEqual(None, self.formulas.data_field(t, tbase.TablePos(1, 1)))
+
+    def testRecalculateEarlierEdit(self):
+        t = self.syntax.table_parser.parse_text(self.text)
+        formulas = table_formula.TableFormulas("$4=$2*$3::@4$4=vsum(@2$4..@3$4)")
+        formulas.recalculate(t)
+        # Apple count edited, then recalculation from Pear price field
+        t[2][1].data = "4"
+        self.assertEqual(3, formulas.recalculate(t, [(3, 3)]))
+        self.assertEqual("6", t[2][3].data)
+        self.assertEqual("12", t[5][3].data)
+        # overwritten formula field is computed again
+        t[5][3].data = "1"
+        self.assertEqual(2, formulas.recalculate(t, [(3, 3)]))
+        self.assertEqual("12", t[5][3].data)
+
+    def testGraphCache(self):
+        line = "#+TBLFM: $4=$2*$3::@4$4=vsum(@2$4..@3$4)::@4$2=vcount(@2$2..@3$2)"
+        self.assertTrue(self.formulas is
+                        table_formula.TableFormulas.parse_line(line))
+        t = self.syntax.table_parser.parse_text(self.text)
+        sheet = table_formula.Sheet(t)
+        cells, dependents = self.formulas.graph(sheet)
+        self.assertEqual([(3, 4), (4, 2)], sorted(dependents[(3, 2)]))
+        t[2][1].data = "5"
+        self.assertTrue(cells is self.formulas.graph(table_formula.Sheet(t))[0])
+        # added row changes the graph
+        t = self.syntax.table_parser.parse_text(self.text.replace(
+            "| Pear ", "| Plum  |     1 |     1 |       |\n| Pear "))
+        cells = self.formulas.graph(table_formula.Sheet(t))[0]
+        self.assertTrue((5, 4) in cells)
+        self.assertEqual(5, self.formulas.recalculate(t))
+        self.assertEqual("1", t[3][3].data)
+
+    def testExpression(self):
+        t = self.syntax.table_parser.parse_text("| 2 | 3 | |")
+        formulas = table_formula.TableFormulas("$3=-($1+$2)*2/4+vmax($1..$2, 7)")
+        formulas.recalculate(t)
+        self.assertEqual("4.5", t[0][2].data)
+
+    def testErrors(self):
+        t = self.syntax.table_parser.parse_text("| a | 1 | |")
+        self.assertRaises(tbase.TableException, table_formula.TableFormulas, "$3=$1+")
+        self.assertRaises(tbase.TableException, table_formula.TableFormulas, "$3=foo($1)")
+        self.assertRaises(tbase.TableException,
+                          table_formula.TableFormulas("$3=$1").recalculate, t)
+        self.assertRaises(tbase.TableException,
+                          table_formula.TableFormulas("$3=$2/0").recalculate, t)
+        self.assertRaises(tbase.TableException,
+                          table_formula.TableFormulas("$3=$2::$2=$3").recalculate, t)
+        self.assertRaises(tbase.TableException,
+                          table_formula.TableFormulas("@2$1=1").recalculate, t)
+        self.assertRaises(tbase.TableException,
+                          table_formula.TableFormulas("$3=$2*1e308*10").recalculate, t)
+
+
+class ConvertTableTest(BaseTableTest):
+
+    def convert(self, text, source, target):
+        table = table_lib.create_syntax(source).table_parser.parse_text(text)
+        return table_lib.convert_table(table,
+                                       table_lib.create_syntax(target)).render()
+
+    def testReStructuredTextToMultiMarkdown(self):
+        self.assert_table_equals("""
+| Name | Age |
+| ---- | --- |
+| Anna |  21 |
+| Bob  |   3 |
+""".strip(), self.convert("""
++------+-----+
+| Name | Age |
++======+=====+
+| Anna | 21  |
++------+-----+
+| Bob  | 3   |
++------+-----+
+""".strip(), "reStructuredText", "MultiMarkdown"))
+
+    def testSimpleToTextile(self):
+        self.assert_table_equals("""
+|_. Name |_. Age |
+|<. Anna |=.  21 |
+""".strip(), self.convert("""
+| Name | Age |
+| < | # |
+|---|---|
+| Anna | 21 |
+""".strip(), "Simple", "Textile"))
+
+    def testTextileToMultiMarkdown(self):
+        self.assert_table_equals("""
+| Name | Age |
+| ---- | --- |
+| Anna |  21 |
+| Bob       ||
+""".strip(), self.convert(r"""
+|_. Name |_. Age |
+| Anna | 21 |
+|\2. Bob |
+""".strip(), "Textile", "MultiMarkdown"))
+
+    def testTextileCellAlignsToMultiMarkdown(self):
+        # first row has no alignment, second column has mixed alignments
+        self.assert_table_equals("""
+| Name | Age |
+| ---- | --: |
+| Anna |  21 |
+| Bob  |  22 |
+| Carl |  23 |
+""".strip(), self.convert(r"""
+|_. Name |_. Age |
+| Anna | 21 |
+| Bob |>. 22 |
+| Carl |>. 23 |
+""".strip(), "Textile", "MultiMarkdown"))
+
+    def testMultiMarkdownToSimple(self):
+        self.assert_table_equals("""
+| Name | Age |
+| <<<< | ### |
+|------|-----|
+| Anna |  21 |
+| Bob  |     |
+""".strip(), self.convert("""
+| Name | Age |
+|:-----|:---:|
+| Anna | 21 |
+| Bob ||
+""".strip(), "MultiMarkdown", "Simple"))
+
+    def testSimpleToReStructuredText(self):
+        self.assert_table_equals("""
++------+-----+
+| Name | Age |
++======+=====+
+| Bob  |  10 |
++------+-----+
+| Anna |  21 |
++------+-----+
+""".strip(), self.convert("""
+| Name | Age |
+|------|-----|
+| Bob | 10 |
+| Anna | 21 |
+""".strip(), "Simple", "reStructuredText"))
+
+    def testReStructuredTextRoundTrip(self):
+        text = """
++------+-----+
+| Name | Age |
++======+=====+
+| Anna |  21 |
++------+-----+
+| Bob  |   3 |
++------+-----+
+""".strip()
+        for syntax_name in ["Simple", "EmacsOrgMode", "Pandoc",
+                            "MultiMarkdown", "Textile"]:
+            converted = self.convert(text, "reStructuredText", syntax_name)
+            self.assert_table_equals(text, self.convert(
+                converted, syntax_name, "reStructuredText"))
+
+    def testMultiMarkdownRoundTrip(self):
+        text = """
+| Name | Gender | Age |
+| :--- | :----: | --: |
+| Anna |   F    |  21 |
+| Bob  |   M    |   3 |
+""".strip()
+        for syntax_name in ["Simple", "Textile"]:
+            converted = self.convert(text, "MultiMarkdown", syntax_name)
+            self.assert_table_equals(text, self.convert(
+                converted, syntax_name, "MultiMarkdown"))
+
+
+class CreateSyntaxTest(BaseTableTest):
+
+    def setUp(self):
+        self.syntax_factories = dict(table_lib._syntax_factories)
+        # syntax modules removed by unload_syntax, name -> module
+        self.unloaded_modules = {}
+
+    def tearDown(self):
+        for syntax_name in list(table_lib._syntax_factories):
+            if syntax_name not in self.syntax_factories:
+                del table_lib._syntax_factories[syntax_name]
+        table_lib._syntax_factories.update(self.syntax_factories)
+        package = table_lib.__name__.rpartition('.')[0]
+        for name, module in self.unloaded_modules.items():
+            sys.modules[name] = module
+            if package:
+                setattr(sys.modules[package], name.rpartition('.')[2], module)
+
+    def unload_syntax(self, syntax_name):
+        """Forget syntax module, return its name in sys.modules."""
+        table_lib._syntax_factories.pop(syntax_name, None)
+        package = table_lib.__name__.rpartition('.')[0]
+        module_name = table_lib._syntax_modules[syntax_name]
+        if package:
+            if hasattr(sys.modules[package], module_name):
+                delattr(sys.modules[package], module_name)
+            module_name = package + '.' + module_name
+        if module_name in sys.modules:
+            self.unloaded_modules[module_name] = sys.modules.pop(module_name)
+        return module_name
+
+    def testLazyImport(self):
+        table_lib.pandoc_syntax()
+        module_name = self.unload_syntax("Pandoc")
+        self.assertTrue("Pandoc" in table_lib.syntax_names())
+        table_lib.simple_syntax()
+        self.assertFalse(module_name in sys.modules)
+        self.assertEqual("Pandoc", table_lib.pandoc_syntax().name)
+        self.assertTrue(module_name in sys.modules)
+
+    def testUnknownSyntax(self):
+        self.assertRaises(ValueError, table_lib.create_syntax, "Unknown")
+
+    def testRegisterSyntax(self):
+        configurations = []
+
+        def create_syntax(table_configuration=None):
+            configurations.append(table_configuration)
+            return table_lib.create_syntax("Simple", table_configuration)
+
+        table_lib.register_syntax("Custom", create_syntax)
+        table_configuration = tbase.TableConfiguration()
+        syntax = table_lib.create_syntax("Custom", table_configuration)
+        self.assertEqual([table_configuration], configurations)
+        self.assertEqual("Simple", syntax.name)
+        self.assertTrue("Custom" in table_lib.syntax_names())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -53,9 +53,15 @@ class LineCell:
 
 
 class Line:
+    DATA = 'data'
+    SINGLE_SEPARATOR = 'single'
+    DOUBLE_SEPARATOR = 'double'
+    ALIGN = 'align'
+
     def __init__(self):
         self.cells = []
         self.prefix = ""
+        self.kind = Line.DATA
 
     def str_cols(self):
         return [cell.text for cell in self.cells]
@@ -103,21 +109,49 @@ class LineParser:
 
 
 class LineParserPlus:
-
-    def __init__(self, border_pattern):
+    """
+    Choose '+' or data borders for the line and classify it as one of
+    line_kinds, a list of (kind, cell pattern) tried in order. The line
+    is of the kind when every cell matches the cell pattern, which is
+    checked by a single match of the whole line, data lines match nothing.
+    Cell patterns must not match border characters.
+    """
+
+    # lines parsed with '+' as a border
+    PLUS_LINE_PATTERN = r"\s*(?:[+]|[|+]\s*-[\s|+-]+$|[|+]\s*=[\s|+=]+$)"
+
+    def __init__(self, border_pattern, line_kinds=None):
         self.plus_line_parser = LineParser("(?:[+|])")
-
-        self.plus_line_pattern = re.compile("^\s*[+]")
-        self.single_hline_pattern = re.compile('^\s*[|+]\s*-[\s|+-]+$')
-        self.double_hline_pattern = re.compile('^\s*[|+]\s*=[\s|+=]+$')
-
         self.data_line_parser = LineParser(border_pattern)
 
+        # group name -> (line parser, kind)
+        self.line_groups = {"plus": (self.plus_line_parser, Line.DATA)}
+        plus_lines = self._kind_alternatives(
+            self.plus_line_parser, "(?:[+|])", line_kinds or [])
+        data_lines = self._kind_alternatives(
+            self.data_line_parser, "(?:" + border_pattern + ")", line_kinds or [])
+        self.line_pattern = re.compile(
+            "(?=" + LineParserPlus.PLUS_LINE_PATTERN + ")(?:" +
+            "|".join(plus_lines + ["(?P<plus>)"]) + ")" +
+            "".join("|" + alternative for alternative in data_lines))
+
+    def _kind_alternatives(self, parser, border, line_kinds):
+        alternatives = []
+        for kind, cell_pattern in line_kinds:
+            name = "k{0}".format(len(self.line_groups))
+            cell = "(?:" + cell_pattern + ")"
+            alternatives.append(
+                "(?P<{0}>\\s*{1}(?:{2}{1})*{2}(?:{1}\\s*)?$)".format(
+                    name, border, cell))
+            self.line_groups[name] = (parser, kind)
+        return alternatives
+
     def parse(self, line_text):
-        if (self.single_hline_pattern.match(line_text) or
-                self.double_hline_pattern.match(line_text) or
-                self.plus_line_pattern.match(line_text)):
-            return self.plus_line_parser.parse(line_text)
+        mo = self.line_pattern.match(line_text)
+        if mo:
+            parser, kind = self.line_groups[mo.lastgroup]
         else:
-            return self.data_line_parser.parse(line_text)
-
+            parser, kind = self.data_line_parser, Line.DATA
+        line = parser.parse(line_text)
+        line.kind = kind
+        return line
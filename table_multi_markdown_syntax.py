@@ -46,13 +46,17 @@ class MultiMarkdownTableSyntax(tbase.TableSyntax):
     def __init__(self, table_configuration):
         tbase.TableSyntax.__init__(self, "Multi Markdown", table_configuration)
 
-        self.line_parser = tparser.LineParserPlus("(?:(?:\|\|+)|(?:\|))")
+        self.line_parser = tparser.LineParserPlus(
+            "(?:(?:\|\|+)|(?:\|))",
+            [(tparser.Line.ALIGN, MultiMarkdownAlignColumn.CELL_PATTERN)])
         self.table_parser = MultiMarkdownTableParser(self)
         self.table_driver = MultiMarkdownTableDriver(self)
 
 
 class MultiMarkdownAlignColumn(tbase.Column):
     PATTERN = r"^\s*([\:]?[\-]+[\:]?)\s*$"
+    CELL_PATTERN = r"\s*:?-+:?\s*"
+    __slots__ = ('_align_follow',)
 
     def __init__(self, row, data):
         tbase.Column.__init__(self, row)
@@ -95,6 +99,7 @@ class MultiMarkdownAlignColumn(tbase.Column):
 
 
 class MultiMarkdownAlignRow(tbase.Row):
+    __slots__ = ()
 
     def new_empty_column(self):
         return MultiMarkdownAlignColumn(self, '-')
@@ -114,16 +119,8 @@ class MultiMarkdownAlignRow(tbase.Row):
 
 class MultiMarkdownTableParser(tbase.BaseTableParser):
 
-    def _is_multi_markdown_align_row(self, str_cols):
-        if len(str_cols) == 0:
-            return False
-        for col in str_cols:
-            if not MultiMarkdownAlignColumn.match_cell(col):
-                return False
-        return True
-
     def create_row(self, table, line):
-        if self._is_multi_markdown_align_row(line.str_cols()):
+        if line.kind == tparser.Line.ALIGN:
             row = MultiMarkdownAlignRow(table)
         else:
             row = tbase.DataRow(table)
@@ -137,6 +134,38 @@ class MultiMarkdownTableParser(tbase.BaseTableParser):
 
 
 class MultiMarkdownTableDriver(tbase.TableDriver):
+    ALIGN_TEXT = {tbase.Column.ALIGN_LEFT: ':-',
+                  tbase.Column.ALIGN_RIGHT: '-:',
+                  tbase.Column.ALIGN_CENTER: ':-:',
+                  None: '-'}
+
+    def create_separator_row(self, table, separator='-'):
+        return MultiMarkdownAlignRow(table)
+
+    def create_align_row(self, table, aligns):
+        row = MultiMarkdownAlignRow(table)
+        for align in aligns:
+            row.append(MultiMarkdownAlignColumn(row, self.ALIGN_TEXT[align]))
+        return row
+
+    def arrange_converted_rows(self, table, rows, aligns):
+        # single align row which is neither the first nor the last row
+        header_count = self.converted_header_count(rows)
+        content = [row for row, header in rows
+                   if not row.is_separator() and not row.is_align()]
+        if 0 < header_count < len(content):
+            content.insert(header_count, self.create_align_row(table, aligns))
+        return content
+
+    def create_content_row(self, table, cells, header=False):
+        row = tbase.DataRow(table)
+        for text, colspan, align in cells:
+            column = tbase.DataColumn(row, text)
+            if colspan > 1:
+                column.colspan = colspan
+                column.right_border_text = '|' * colspan
+            row.append(column)
+        return row
 
     def editor_insert_single_hline(self, table, table_pos):
         table.rows.insert(table_pos.row_num + 1, MultiMarkdownAlignRow(table))
@@ -43,8 +43,9 @@ class PandocTableSyntax(tbase.TableSyntax):
     def __init__(self, table_configuration):
         tbase.TableSyntax.__init__(self, "Pandoc", table_configuration)
 
+        self.line_parser = tborder.create_line_parser()
         self.table_parser = tborder.BorderTableParser(self)
-        self.table_driver = tborder.BorderTableDriver(self)
+        self.table_driver = tborder.GridTableDriver(self)
 
         self.hline_out_border = '+'
         self.hline_in_border = '+'
@@ -23,32 +23,274 @@
 
 import sublime
 import sublime_plugin
+import csv
 import re
+import io
+import os
+import time
+import collections
+import contextlib
+import tempfile
+
+try:
+    import cProfile as profile
+    import pstats
+except ImportError:
+    profile = None
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
 
 try:
     from . import table_lib as tlib
     from . import table_base as tbase
+    from . import table_formula as tformula
 except ValueError:
     import table_lib as tlib
     import table_base as tbase
+    import table_formula as tformula
+
+
+_clock = getattr(time, "perf_counter", time.time)
+
+
+class PhaseTimer:
+    """
+    Record durations of command phases: detect, extract, parse, pack,
+    operation, render, merge and cursor.
+    Disabled timer doesn't measure anything.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phases = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = _clock()
+        try:
+            yield
+        finally:
+            self.phases.append((name, _clock() - start))
+
+    def total(self):
+        return sum(duration for name, duration in self.phases)
+
+    def format(self):
+        parts = ["{0}={1:.2f}".format(name, duration * 1000)
+                 for name, duration in self.phases]
+        return "total={0:.2f}ms {1}".format(self.total() * 1000,
+                                           " ".join(parts))
+
+
+class LatencyHistory:
+    """
+    Rolling history of phase timings per command.
+    """
+    SIZE = 200
+    BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500]
+
+    def __init__(self):
+        self.commands = {}
+
+    def record(self, command_name, timer):
+        if command_name not in self.commands:
+            self.commands[command_name] = collections.deque(maxlen=LatencyHistory.SIZE)
+        self.commands[command_name].append(timer.phases)
+
+    def clear(self):
+        self.commands.clear()
+
+    @staticmethod
+    def _percentile(values, percent):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+    def _histogram(self, totals):
+        counts = [0] * (len(LatencyHistory.BUCKETS) + 1)
+        for total in totals:
+            ind = 0
+            while (ind < len(LatencyHistory.BUCKETS) and
+                    total * 1000 >= LatencyHistory.BUCKETS[ind]):
+                ind += 1
+            counts[ind] += 1
+        lines = []
+        labels = (["< {0}ms".format(bucket) for bucket in LatencyHistory.BUCKETS] +
+                  [">= {0}ms".format(LatencyHistory.BUCKETS[-1])])
+        for label, count in zip(labels, counts):
+            if count:
+                bar = "#" * max(1, count * 40 // len(totals))
+                lines.append("    {0:>9} {1:5} {2}".format(label, count, bar))
+        return lines
+
+    def report(self):
+        if not self.commands:
+            return "No commands recorded, enable table_editor_profile setting"
+        lines = []
+        for command_name in sorted(self.commands):
+            history = self.commands[command_name]
+            totals = [sum(duration for name, duration in phases)
+                      for phases in history]
+            lines.append("{0}: {1} runs".format(command_name, len(history)))
+            lines.append("    {0:<10} {1:>9} {2:>9} {3:>9}".format(
+                "phase", "median ms", "p90 ms", "max ms"))
+            names = []
+            durations = {}
+            for phases in history:
+                for name, duration in phases:
+                    if name not in durations:
+                        names.append(name)
+                        durations[name] = []
+                    durations[name].append(duration)
+            for name in names + ["total"]:
+                values = totals if name == "total" else durations[name]
+                lines.append("    {0:<10} {1:9.2f} {2:9.2f} {3:9.2f}".format(
+                    name,
+                    self._percentile(values, 50) * 1000,
+                    self._percentile(values, 90) * 1000,
+                    max(values) * 1000))
+            lines.extend(self._histogram(totals))
+            lines.append("")
+        return "\n".join(lines)
+
+
+latency_history = LatencyHistory()
+
+
+class ViewportJob:
+    """
+    Rows of a table left to format after the visible rows, see
+    AbstractTableCommand.merge_viewport_first. The next table command
+    finishes the job first, the job is dropped when the view is changed
+    by anything else and the table is left partially aligned.
+    """
+
+    def __init__(self, table, first_table_row, ranges):
+        self.table = table
+        self.first_table_row = first_table_row
+        self.ranges = ranges
+        self.change_count = None
+
+
+# view id -> ViewportJob
+viewport_jobs = {}
+
+
+class TableRegionIndex:
+    """
+    Per view cache of table lines for key binding context, a line is
+    scanned once until the view changes.
+    """
+    ROW = "row"
+    HLINE = "hline"
+    HLINE_PATTERN = re.compile(r"[^-+|=\s]")
+
+    def __init__(self):
+        # view id -> (change count, {row: line info})
+        self._views = {}
+
+    def forget(self, view):
+        self._views.pop(view.id(), None)
+
+    def line_info(self, view, row):
+        change_count = view.change_count()
+        cached = self._views.get(view.id())
+        if cached is None or cached[0] != change_count:
+            cached = (change_count, {})
+            self._views[view.id()] = cached
+        lines = cached[1]
+        if row not in lines:
+            point = view.text_point(row, 0)
+            lines[row] = self._scan(view.substr(view.line(point)))
+        return lines[row]
+
+    def _scan(self, text):
+        # (kind, first border, last border, last not hline char)
+        stripped = text.lstrip()
+        first = len(text) - len(stripped)
+        if stripped[:1] == '|':
+            return (self.ROW, first, text.rfind('|'), -1)
+        if stripped[:1] == '+' and text.rstrip()[-1:] in ('+', '|'):
+            last_text = -1
+            for mo in self.HLINE_PATTERN.finditer(text):
+                last_text = mo.start()
+            return (self.HLINE, first, len(text.rstrip()) - 1, last_text)
+        return None
+
+    def in_table(self, view, point, field=False):
+        """
+        Return True if point is after the first border of a table row or
+        of a +---+ separator line. With field, a row must also have a border
+        after point.
+        """
+        row, col = view.rowcol(point)
+        info = self.line_info(view, row)
+        if info is None:
+            return False
+        kind, first, last, last_text = info
+        if col <= first:
+            return False
+        if kind == self.HLINE:
+            return last_text < col <= last
+        return not field or col <= last
+
+
+table_region_index = TableRegionIndex()
+
+
+def show_output_panel(window, name, text):
+    if hasattr(window, "create_output_panel"):
+        panel = window.create_output_panel(name)
+    else:
+        panel = window.get_output_panel(name)
+    panel.run_command("append", {"characters": text})
+    window.run_command("show_panel", {"panel": "output." + name})
+
+
+def replace_lines(view, edit, first_row, new_lines):
+    for row, new_text in enumerate(new_lines, first_row):
+        region = view.line(view.text_point(row, 0))
+        old_text = view.substr(region)
+        if old_text != new_text:
+            view.replace(edit, region, new_text)
 
 
 class TableContext:
 
-    def __init__(self, view, sel, syntax):
+    def __init__(self, view, sel, syntax, timer=None, fast_align=False):
         self.view = view
         (sel_row, sel_col) = self.view.rowcol(sel.begin())
         self.syntax = syntax
-
-        self.first_table_row = self._get_first_table_row(sel_row, sel_col)
-        self.last_table_row = self._get_last_table_row(sel_row, sel_col)
-        self.table_text = self._get_table_text(self.first_table_row, self.last_table_row)
-        self.visual_field_num = self._visual_field_num(sel_row, sel_col)
+        self.timer = timer or PhaseTimer(False)
+
+        with self.timer.phase("detect"):
+            self.first_table_row = self._get_first_table_row(sel_row, sel_col)
+            self.last_table_row = self._get_last_table_row(sel_row, sel_col)
+        with self.timer.phase("extract"):
+            self.table_text = self._get_table_text(self.first_table_row, self.last_table_row)
+            self.visual_field_num = self._visual_field_num(sel_row, sel_col)
         self.row_num = sel_row - self.first_table_row
+        self.formula_text = self._get_formula_text()
 
         self.table_pos = tbase.TablePos(self.row_num, self.visual_field_num)
-
-        self.table = self.syntax.table_parser.parse_text(self.table_text)
+        if sel.empty():
+            self.end_table_pos = self.table_pos
+        else:
+            self.end_table_pos = self._end_table_pos(sel_row, sel)
+
+        with self.timer.phase("parse"):
+            self.table = self.syntax.table_parser.parse_text(self.table_text,
+                                                             pack=False)
+        with self.timer.phase("pack"):
+            # only the current row was edited in already aligned table
+            if not (fast_align and self.table.pack_edited_row(
+                    self.table_text.splitlines(), self.row_num)):
+                self.table.pack()
         self.table_driver = self.syntax.table_driver
         self.field_num = self.table_driver.visual_to_internal_index(self.table, self.table_pos).field_num
 
@@ -80,6 +322,32 @@ class TableContext:
         text = self._get_text(row)
         return self.syntax.table_parser.is_table_row(text)
 
+    def _get_formula_text(self):
+        if not self.syntax.formula_support:
+            return None
+        row = self.last_table_row + 1
+        if row > self.view.rowcol(self.view.size())[0]:
+            return None
+        text = self._get_text(row)
+        if tformula.is_formula_line(text):
+            return text
+        return None
+
+    def _end_table_pos(self, sel_row, sel):
+        (end_row, end_col) = self.view.rowcol(sel.end())
+        if end_row > self.last_table_row or (end_col == 0 and end_row > sel_row):
+            end_row = min(end_row - 1, self.last_table_row)
+            end_col = len(self._get_text(end_row))
+        # selection end is exclusive
+        visual_field_num = self._visual_field_num(end_row, max(end_col - 1, 0))
+        return tbase.TablePos(end_row - self.first_table_row, visual_field_num)
+
+    def is_row_range(self):
+        return self.end_table_pos.row_num != self.table_pos.row_num
+
+    def is_column_range(self):
+        return self.end_table_pos.field_num != self.table_pos.field_num
+
     def _visual_field_num(self, sel_row, sel_col):
         line_text = self._get_text(sel_row)
         line = self.syntax.line_parser.parse(line_text)
@@ -93,6 +361,11 @@ class TableContext:
 
 
 class AbstractTableCommand(sublime_plugin.TextCommand):
+    # repeated operation doesn't need packed table between repeats
+    deferred_pack = True
+    # operation may keep other rows of already aligned table as they are
+    fast_align = False
+    count = 1
 
     def detect_syntax(self):
         if self.view.settings().has("table_editor_syntax"):
@@ -129,6 +402,15 @@ class AbstractTableCommand(sublime_plugin.TextCommand):
         if self.view.settings().has("table_editor_intelligent_formatting"):
             table_configuration.intelligent_formatting = self.view.settings().get("table_editor_intelligent_formatting")
 
+        if self.view.settings().has("table_editor_csv_sniff_sample_size"):
+            table_configuration.csv_sniff_sample_size = self.view.settings().get("table_editor_csv_sniff_sample_size")
+
+        if self.view.settings().has("table_editor_csv_sniff_sample_lines"):
+            table_configuration.csv_sniff_sample_lines = self.view.settings().get("table_editor_csv_sniff_sample_lines")
+
+        if self.view.settings().has("table_editor_fast_align"):
+            table_configuration.fast_align = self.view.settings().get("table_editor_fast_align")
+
         syntax = tlib.create_syntax(syntax_name, table_configuration)
         return syntax
 
@@ -145,16 +427,19 @@ class AbstractTableCommand(sublime_plugin.TextCommand):
             return "Simple"
 
     def merge(self, edit, ctx):
-        table = ctx.table
-        new_lines = table.render_lines()
+        if self.is_viewport_first(ctx):
+            self.merge_viewport_first(edit, ctx)
+            return
+        with ctx.timer.phase("render"):
+            new_lines = ctx.table.render_lines()
+        with ctx.timer.phase("merge"):
+            self.merge_lines(edit, ctx, new_lines)
+
+    def merge_lines(self, edit, ctx, new_lines):
         first_table_row = ctx.first_table_row
         last_table_row = ctx.last_table_row
         rows = range(first_table_row, last_table_row + 1)
-        for row, new_text in zip(rows, new_lines):
-            region = self.view.line(self.view.text_point(row, 0))
-            old_text = self.view.substr(region)
-            if old_text != new_text:
-                self.view.replace(edit, region, new_text)
+        replace_lines(self.view, edit, first_table_row, new_lines[:len(rows)])
 
         #case 1: some lines inserted
         if len(rows) < len(new_lines):
@@ -163,16 +448,80 @@ class AbstractTableCommand(sublime_plugin.TextCommand):
                 end_point = self.view.line(self.view.text_point(row, 0)).end()
                 self.view.insert(edit, end_point, "\n" + new_text)
                 row = row + 1
-        #case 2: some lines deleted
+        #case 2: some lines deleted, erase them with line ends
         elif len(rows) > len(new_lines):
-            for row in rows[len(new_lines):]:
-                region = self.view.line(self.view.text_point(row, 0))
-                self.view.erase(edit, region)
+            last_point = self.view.text_point(last_table_row, 0)
+            if len(new_lines) > 0:
+                # from the end of the last kept line, table may end the view
+                begin = self.view.line(self.view.text_point(
+                    first_table_row + len(new_lines) - 1, 0)).end()
+                end = self.view.line(last_point).end()
+            else:
+                begin = self.view.text_point(first_table_row, 0)
+                end = self.view.full_line(last_point).end()
+            self.view.erase(edit, sublime.Region(begin, end))
+
+    def is_viewport_first(self, ctx):
+        settings = self.view.settings()
+        row_count = ctx.last_table_row - ctx.first_table_row + 1
+        return (settings.get("table_editor_viewport_first", False)
+                and len(self.view.sel()) == 1
+                and len(ctx.table) == row_count
+                and row_count > settings.get("table_editor_viewport_first_min_rows",
+                                             2000))
+
+    def merge_viewport_first(self, edit, ctx):
+        """
+        Replace visible rows of the table now, rows above and bellow
+        the visible region are replaced later by chunks.
+        """
+        visible = self.view.visible_region()
+        start = self.view.rowcol(visible.begin())[0] - ctx.first_table_row
+        stop = self.view.rowcol(visible.end())[0] - ctx.first_table_row + 1
+        if not start <= ctx.row_num < stop:
+            # cursor row is shown after the command
+            height = stop - start
+            start = ctx.row_num - height // 2
+            stop = start + height
+        start = min(max(start, 0), len(ctx.table))
+        stop = min(max(stop, start), len(ctx.table))
+        with ctx.timer.phase("render"):
+            new_lines = ctx.table.render_lines(start, stop)
+        with ctx.timer.phase("merge"):
+            replace_lines(self.view, edit, ctx.first_table_row + start,
+                          new_lines)
+
+        chunk_size = self.view.settings().get("table_editor_viewport_chunk_size",
+                                              2000)
+        ranges = []
+        for chunk_start in range(stop, len(ctx.table), chunk_size):
+            ranges.append((chunk_start, min(chunk_start + chunk_size,
+                                            len(ctx.table))))
+        for chunk_stop in range(start, 0, -chunk_size):
+            ranges.append((max(chunk_stop - chunk_size, 0), chunk_stop))
+        if ranges:
+            viewport_jobs[self.view.id()] = ViewportJob(ctx.table,
+                                                        ctx.first_table_row,
+                                                        ranges)
+        else:
+            viewport_jobs.pop(self.view.id(), None)
 
-    def create_context(self, sel):
-        return TableContext(self.view, sel, self.detect_syntax())
+    def create_context(self, sel, timer=None):
+        return TableContext(self.view, sel, self.detect_syntax(), timer,
+                            self.fast_align)
 
-    def run(self, edit):
+    def create_timer(self):
+        return PhaseTimer(bool(self.view.settings().get("table_editor_profile", False)))
+
+    def record_timer(self, timer):
+        if timer.enabled:
+            command_name = type(self).__name__
+            print("Table Editor: {0} {1}".format(command_name, timer.format()))
+            latency_history.record(command_name, timer)
+
+    def run(self, edit, count=1):
+        self.count = count
+        finish_viewport_job(self.view, edit)
         new_sels = []
         for sel in self.view.sel():
             new_sel = self.run_one_sel(edit, sel)
@@ -181,17 +530,40 @@ class AbstractTableCommand(sublime_plugin.TextCommand):
         for sel in new_sels:
             self.view.sel().add(sel)
             self.view.show(sel, False)
+        schedule_viewport_job(self.view)
 
     def run_one_sel(self, edit, sel):
-        ctx = self.create_context(sel)
+        timer = self.create_timer()
+        ctx = self.create_context(sel, timer)
         try:
-            msg, table_pos = self.run_operation(ctx)
+            with timer.phase("operation"):
+                msg, table_pos = self.repeat_operation(ctx)
             self.merge(edit, ctx)
             sublime.status_message("Table Editor: {0}".format(msg))
-            return self.table_pos_sel(ctx, table_pos)
         except tbase.TableException as err:
             sublime.status_message("Table Editor: {0}".format(err))
-            return self.table_pos_sel(ctx, ctx.table_pos)
+            table_pos = ctx.table_pos
+        with timer.phase("cursor"):
+            new_sel = self.table_pos_sel(ctx, table_pos)
+        self.record_timer(timer)
+        return new_sel
+
+    def repeat_operation(self, ctx):
+        if self.count == 1:
+            return self.run_operation(ctx)
+
+        table_pos = ctx.table_pos
+
+        def operation(table, pos):
+            ctx.table_pos = pos
+            return self.run_operation(ctx)
+
+        try:
+            return ctx.table_driver.editor_repeat(operation, ctx.table,
+                                                  table_pos, self.count,
+                                                  self.deferred_pack)
+        finally:
+            ctx.table_pos = table_pos
 
     def visual_field_sel(self, ctx, row_num, visual_field_num):
         if ctx.table.empty():
@@ -220,17 +592,78 @@ class TableEditorAlignCommand(AbstractTableCommand):
     Key: ctrl+shift+a
     Re-align the table without change the current table field.
     Move cursor to begin of the current table field.
+    Recompute formula fields which depend on the current field
+    or on fields changed since the last recalculation.
     """
     def run_operation(self, ctx):
+        if ctx.formula_text is not None:
+            formulas = tformula.TableFormulas.parse_line(ctx.formula_text)
+            field = formulas.data_field(ctx.table, ctx.table_pos)
+            if field is not None:
+                formulas.recalculate(ctx.table, [field])
+                ctx.table.pack()
         return ctx.table_driver.editor_align(ctx.table, ctx.table_pos)
 
 
+class TableEditorRecalculate(AbstractTableCommand):
+    """
+    Command: table_editor_recalculate
+    Recompute all formula fields of the table.
+    """
+    def run_operation(self, ctx):
+        tbase.check_condition(ctx.formula_text is not None,
+                              "No #+TBLFM formulas bellow the table")
+        formulas = tformula.TableFormulas.parse_line(ctx.formula_text)
+        count = formulas.recalculate(ctx.table)
+        ctx.table.pack()
+        return ("{0} fields recalculated".format(count),
+                tbase.TablePos(ctx.table_pos.row_num, ctx.table_pos.field_num))
+
+
+class TableEditorProfileAlign(TableEditorAlignCommand):
+    """
+    Command: table_editor_profile_align
+    Re-align the table under cursor under cProfile, write statistics
+    into .prof file (temporary directory unless path is given)
+    and show the top functions in output panel.
+    """
+
+    def run(self, edit, path=None, limit=30, sort="cumulative"):
+        if profile is None:
+            sublime.status_message("Table Editor: cProfile is not available")
+            return
+        if path is None:
+            path = os.path.join(tempfile.gettempdir(), "table_editor_align.prof")
+        path = os.path.expanduser(path)
+
+        sel = self.view.sel()[0]
+        profiler = profile.Profile()
+        new_sel = profiler.runcall(self.run_one_sel, edit, sel)
+        self.view.sel().clear()
+        self.view.sel().add(new_sel)
+        try:
+            profiler.dump_stats(path)
+            header = "Profile written to {0}".format(path)
+        except (IOError, OSError) as err:
+            sublime.status_message("Table Editor: {0}".format(err))
+            header = "Profile is not written: {0}".format(err)
+
+        out = StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        show_output_panel(self.view.window(), "table_editor_profile",
+                          "{0}\n{1}".format(header, out.getvalue()))
+
+
 class TableEditorNextField(AbstractTableCommand):
     """
     Key: tab
     Re-align the table, move to the next field.
     Creates a new row if necessary.
     """
+    deferred_pack = False
+    fast_align = True
+
     def run_operation(self, ctx):
         return ctx.table_driver.editor_next_field(ctx.table, ctx.table_pos)
 
@@ -240,6 +673,9 @@ class TableEditorPreviousField(AbstractTableCommand):
     Key: shift+tab
     Re-align, move to previous field.
     """
+    deferred_pack = False
+    fast_align = True
+
     def run_operation(self, ctx):
         return ctx.table_driver.editor_previous_field(ctx.table, ctx.table_pos)
 
@@ -251,6 +687,9 @@ class TableEditorNextRow(AbstractTableCommand):
     Creates a new row if necessary.
     At the beginning or end of a line, enter still does new line.
     """
+    deferred_pack = False
+    fast_align = True
+
     def run_operation(self, ctx):
         return ctx.table_driver.editor_next_row(ctx.table, ctx.table_pos)
 
@@ -278,38 +717,50 @@ class TableEditorMoveColumnRight(AbstractTableCommand):
 class TableEditorDeleteColumn(AbstractTableCommand):
     """
     Key: alt+shift+left
-    Kill the current column.
+    Kill the current column, or all selected columns.
     """
     def run_operation(self, ctx):
-        return ctx.table_driver.editor_delete_column(ctx.table,
-                                                     ctx.table_pos)
+        if ctx.is_column_range():
+            return ctx.table_driver.editor_delete_columns(ctx.table, ctx.table_pos,
+                                                          ctx.end_table_pos)
+        return ctx.table_driver.editor_delete_column(ctx.table, ctx.table_pos)
 
 
 class TableEditorInsertColumn(AbstractTableCommand):
     """
     Keys: alt+shift+right
-    Insert a new column to the left of the cursor position.
+    Insert a new column to the left of the cursor position,
+    or as many columns as selected.
     """
     def run_operation(self, ctx):
-        return ctx.table_driver.editor_insert_column(ctx.table,
-                                                     ctx.table_pos)
+        if ctx.is_column_range():
+            return ctx.table_driver.editor_insert_columns(ctx.table, ctx.table_pos,
+                                                          ctx.end_table_pos)
+        return ctx.table_driver.editor_insert_column(ctx.table, ctx.table_pos)
 
 
 class TableEditorKillRow(AbstractTableCommand):
     """
     Key : alt+shift+up
-    Kill the current row.
+    Kill the current row, or all selected rows.
     """
     def run_operation(self, ctx):
+        if ctx.is_row_range():
+            return ctx.table_driver.editor_kill_rows(ctx.table, ctx.table_pos,
+                                                     ctx.end_table_pos)
         return ctx.table_driver.editor_kill_row(ctx.table, ctx.table_pos)
 
 
 class TableEditorInsertRow(AbstractTableCommand):
     """
     Key: alt+shift+down
-    Insert a new row above the current row.
+    Insert a new row above the current row,
+    or as many rows as selected.
     """
     def run_operation(self, ctx):
+        if ctx.is_row_range():
+            return ctx.table_driver.editor_insert_rows(ctx.table, ctx.table_pos,
+                                                       ctx.end_table_pos)
         return ctx.table_driver.editor_insert_row(ctx.table, ctx.table_pos)
 
 
@@ -358,6 +809,8 @@ class TableEditorHlineAndMove(AbstractTableCommand):
     Insert a horizontal line below current row,
     and move the cursor into the row below that line.
     """
+    deferred_pack = False
+
     def run_operation(self, ctx):
         return ctx.table_driver.editor_insert_hline_and_move(ctx.table,
                                                              ctx.table_pos)
@@ -426,27 +879,243 @@ class TableEditorJoinLines(AbstractTableCommand):
         return ctx.table_driver.editor_join_lines(ctx.table, ctx.table_pos)
 
 
+class TableEditorSort(AbstractTableCommand):
+    """
+    Command: table_editor_sort
+    Sort data rows by the current column within each block between
+    separator rows. Optional arguments numeric (detected by default)
+    and reverse.
+    """
+
+    def run(self, edit, numeric=None, reverse=False):
+        self.numeric = numeric
+        self.reverse = reverse
+        AbstractTableCommand.run(self, edit)
+
+    def run_operation(self, ctx):
+        return ctx.table_driver.editor_sort(ctx.table, ctx.table_pos,
+                                            self.numeric, self.reverse)
+
+
+class TableEditorConvertSyntax(AbstractTableCommand):
+    """
+    Command: table_editor_convert_syntax
+    Convert the current table into table syntax given by argument syntax,
+    choose syntax in quick panel if argument is not given.
+    """
+
+    def run(self, edit, syntax=None):
+        if syntax is None:
+            names = tlib.syntax_names()
+
+            def on_done(index):
+                if index != -1:
+                    self.view.run_command("table_editor_convert_syntax",
+                                          {"syntax": names[index]})
+            self.view.window().show_quick_panel(names, on_done)
+            return
+        self.target_syntax_name = syntax
+        self.converted = False
+        AbstractTableCommand.run(self, edit)
+        if self.converted:
+            # next commands parse the converted table with its syntax
+            self.view.settings().set("table_editor_syntax", syntax)
+
+    def run_operation(self, ctx):
+        syntax = tlib.create_syntax(self.target_syntax_name,
+                                    ctx.syntax.table_configuration)
+        ctx.table = tlib.convert_table(ctx.table, syntax)
+        ctx.table_driver = syntax.table_driver
+        self.converted = True
+        return ("Table converted to {0}".format(syntax.name),
+                tbase.TablePos(0, 0))
+
+
+class TableEditorTranspose(AbstractTableCommand):
+    """
+    Command: table_editor_transpose
+    Swap rows and columns of the table.
+    """
+    def run_operation(self, ctx):
+        return ctx.table_driver.editor_transpose(ctx.table, ctx.table_pos)
+
+
+class TableEditorColumnStats(AbstractTableCommand):
+    """
+    Command: table_editor_column_stats
+    Show count, sum, min, max and mean of numbers in the current column
+    in the status bar. With insert_totals=true append a row with the sum.
+    """
+
+    def run(self, edit, insert_totals=False):
+        self.insert_totals = insert_totals
+        AbstractTableCommand.run(self, edit)
+
+    def run_operation(self, ctx):
+        return ctx.table_driver.editor_column_stats(ctx.table, ctx.table_pos,
+                                                    self.insert_totals)
+
+
 class TableEditorCsvToTable(AbstractTableCommand):
     """
     Command: table_csv_to_table
     Key: ctrl+k, |
-    Convert selected CSV region into table
+    Convert selected CSV region into table.
+    Optional arguments delimiter, quotechar and has_header
+    override CSV dialect detection.
     """
 
+    def run(self, edit, delimiter=None, quotechar=None, has_header=False):
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+        self.has_header = has_header
+        AbstractTableCommand.run(self, edit)
+
     def run_one_sel(self, edit, sel):
         if sel.empty():
             return sel
         else:
             syntax = self.detect_syntax()
             text = self.view.substr(sel)
-            table = syntax.table_driver.parse_csv(text)
-            self.view.replace(edit, sel, table.render())
+            lines = syntax.table_driver.render_csv_lines(text,
+                                                         self.delimiter,
+                                                         self.quotechar,
+                                                         self.has_header)
+            table_text = "\n".join(lines)
+            self.view.replace(edit, sel, table_text)
+
+            if not table_text:
+                pt = sel.begin()
+            else:
+                first_line_text = table_text.split("\n", 1)[0]
+                table = syntax.table_parser.parse_text(first_line_text)
+                first_line = self.view.rowcol(sel.begin())[0]
+                pt = self.view.text_point(first_line, syntax.table_driver.get_cursor(table, tbase.TablePos(0, 0)))
+            msg = "Table created from CSV"
+            if syntax.table_driver.csv_fallback is not None:
+                msg += ", " + syntax.table_driver.csv_fallback
+            sublime.status_message("Table Editor: {0}".format(msg))
+            return sublime.Region(pt, pt)
 
-            first_row = self.view.rowcol(sel.begin())[0]
 
-            pt = self.view.text_point(first_row, syntax.table_driver.get_cursor(table, tbase.TablePos(0, 0)))
-            sublime.status_message("Table Editor: Table created from CSV")
-            return sublime.Region(pt, pt)
+class ViewWriter:
+    """
+    File like object which appends written text to the end of a view.
+    Text is buffered and appended in chunks.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, view):
+        self.view = view
+        self.chunks = []
+        self.size = 0
+
+    def write(self, text):
+        self.chunks.append(text)
+        self.size += len(text)
+        if self.size >= ViewWriter.CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            self.view.run_command("append", {"characters": "".join(self.chunks)})
+            self.chunks = []
+            self.size = 0
+
+
+class TableEditorTableToCsv(AbstractTableCommand):
+    """
+    Command: table_editor_table_to_csv
+    Export the current table as CSV into a new view,
+    or into a file if path is given.
+    Use dialect "excel-tab" for TSV.
+    """
+
+    def run(self, edit, dialect="excel", path=None):
+        try:
+            ctx = self.create_context(self.view.sel()[0])
+            # unknown dialect fails before a view or a file is created
+            csv.get_dialect(dialect)
+            if path is None:
+                view = self.view.window().new_file()
+                writer = ViewWriter(view)
+                count = ctx.table_driver.write_csv(ctx.table, writer, dialect)
+                writer.flush()
+            else:
+                path = os.path.expanduser(path)
+                with io.open(path, "w", encoding="utf-8", newline="") as f:
+                    count = ctx.table_driver.write_csv(ctx.table, f, dialect)
+        except (tbase.TableException, csv.Error, IOError, OSError) as err:
+            sublime.status_message("Table Editor: {0}".format(err))
+            return
+        sublime.status_message("Table Editor: {0} rows exported to CSV"
+                               .format(count))
+
+
+def finish_viewport_job(view, edit):
+    """Replace all rows left by the job of the view, if view is unchanged."""
+    job = viewport_jobs.pop(view.id(), None)
+    if job is None:
+        return
+    if job.change_count != view.change_count():
+        report_partial_align()
+        return
+    for start, stop in job.ranges:
+        replace_lines(view, edit, job.first_table_row + start,
+                      job.table.render_lines(start, stop))
+
+
+def report_partial_align():
+    sublime.status_message("Table Editor: Table is partially aligned, "
+                           "align it again")
+
+
+def schedule_viewport_job(view):
+    job = viewport_jobs.get(view.id())
+    if job is None:
+        return
+    job.change_count = view.change_count()
+    sublime.set_timeout(lambda: view.run_command("table_editor_format_chunk"), 0)
+
+
+class TableEditorFormatChunk(sublime_plugin.TextCommand):
+    """
+    Command: table_editor_format_chunk
+    Internal, replace next chunk of rows of the table aligned with
+    table_editor_viewport_first. Stops if the view was changed meanwhile
+    and reports the partially aligned table.
+    """
+
+    def run(self, edit):
+        job = viewport_jobs.pop(self.view.id(), None)
+        if job is None:
+            return
+        if job.change_count != self.view.change_count():
+            report_partial_align()
+            return
+        start, stop = job.ranges.pop(0)
+        new_lines = job.table.render_lines(start, stop)
+        replace_lines(self.view, edit, job.first_table_row + start, new_lines)
+        if job.ranges:
+            viewport_jobs[self.view.id()] = job
+            schedule_viewport_job(self.view)
+
+
+class TableEditorShowLatency(sublime_plugin.WindowCommand):
+    """
+    Command: table_editor_show_latency
+    Show recorded phase timings of table commands in output panel,
+    timings are recorded when table_editor_profile setting is true.
+    Argument clear=true reset the history.
+    """
+
+    def run(self, clear=False):
+        if clear:
+            latency_history.clear()
+            sublime.status_message("Table Editor: Latency history cleared")
+        else:
+            show_output_panel(self.window, "table_editor_latency",
+                              latency_history.report())
 
 
 class TableEditorDisableForCurrentView(sublime_plugin.TextCommand):
@@ -494,3 +1163,30 @@ class TableEditorSetSyntax(sublime_plugin.TextCommand):
         self.view.settings().set("table_editor_syntax", syntax)
         sublime.status_message("Table Editor: set syntax to '{0}'"
                                .format(syntax))
+
+
+class TableEditorContextListener(sublime_plugin.EventListener):
+    """
+    Key binding contexts table_editor_in_table and
+    table_editor_in_table_field, see TableRegionIndex.in_table.
+    """
+
+    def on_query_context(self, view, key, operator, operand, match_all):
+        if key == "table_editor_in_table":
+            field = False
+        elif key == "table_editor_in_table_field":
+            field = True
+        else:
+            return None
+
+        values = [table_region_index.in_table(view, sel.b, field)
+                  for sel in view.sel()]
+        value = all(values) if match_all else any(values)
+        if operator == sublime.OP_EQUAL:
+            return value == operand
+        elif operator == sublime.OP_NOT_EQUAL:
+            return value != operand
+        return None
+
+    def on_close(self, view):
+        table_region_index.forget(view)
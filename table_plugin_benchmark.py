@@ -0,0 +1,225 @@
+# table_plugin_benchmark.py - Performance benchmarks for table_plugin
+
+# Copyright (C) 2012  Free Software Foundation, Inc.
+
+# Author: Valery Kocubinsky
+# Package: SublimeTableEditor
+# Homepage: https://github.com/vkocubinsky/SublimeTableEditor
+
+# This file is part of SublimeTableEditor.
+
+# SublimeTableEditor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# SublimeTableEditor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with SublimeTableEditor.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks of table_editor_* commands outside of Sublime Text.
+
+Commands run against the in-memory view of table_fake_sublime, the time
+includes context detection, merge and cursor placement, and every command
+reports the number of view API calls. Run from the directory which contains
+the package, for example:
+
+    python -m SublimeTableEditor.table_plugin_benchmark --rows 5000 --calls
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import argparse
+import json
+import platform
+import sys
+
+try:
+    from . import table_fake_sublime as fake
+    from . import table_benchmark as tbench
+    from . import table_lib
+except ValueError:
+    import table_fake_sublime as fake
+    import table_benchmark as tbench
+    import table_lib
+
+
+PLUGIN_COMMANDS = [
+    ("table_editor_align", None),
+    ("table_editor_next_field", None),
+    ("table_editor_previous_field", None),
+    ("table_editor_next_row", None),
+    ("table_editor_move_column_left", None),
+    ("table_editor_move_column_right", None),
+    ("table_editor_move_row_up", None),
+    ("table_editor_move_row_down", None),
+    ("table_editor_delete_column", None),
+    ("table_editor_insert_column", None),
+    ("table_editor_kill_row", None),
+    ("table_editor_insert_row", None),
+    ("table_editor_insert_single_hline", None),
+    ("table_editor_insert_double_hline", None),
+    ("table_editor_hline_and_move", None),
+    ("table_editor_split_column_down", None),
+    ("table_editor_join_lines", None),
+    ("table_editor_sort", None),
+    ("table_editor_transpose", None),
+    ("table_editor_column_stats", None),
+    ("table_editor_convert_syntax", {"syntax": "EmacsOrgMode"}),
+]
+
+# lines of text around the table
+TEXT_BEFORE = "Table bellow is generated\n\n"
+TEXT_AFTER = "\n\nEnd of the text\n"
+
+
+def load_plugin():
+    """Install fake sublime modules and import table_plugin."""
+    fake.install()
+    try:
+        from . import table_plugin
+    except ValueError:
+        import table_plugin
+    fake.register_commands(table_plugin)
+    return table_plugin
+
+
+def buffer_cases(syntax_name, rows, columns):
+    text = tbench.generate_table_text(syntax_name, rows, columns)
+    syntax = table_lib.create_syntax(syntax_name)
+    aligned = syntax.table_parser.parse_text(text).render()
+    return [("plain", text), ("aligned", aligned)]
+
+
+def create_view(syntax_name, text, row, settings=None):
+    values = {"enable_table_editor": True,
+              "table_editor_syntax": syntax_name}
+    values.update(settings or {})
+    view = fake.View(TEXT_BEFORE + text + TEXT_AFTER, values, fake.Window())
+    # second field of the row
+    row = row + TEXT_BEFORE.count("\n")
+    line = view.substr(view.line(view.text_point(row, 0)))
+    col = line.find("|", line.find("|") + 1) + 2
+    view.sel().add(fake.Region(view.text_point(row, col)))
+    return view
+
+
+def run_command(view, name, args):
+    view.run_command(name, args)
+    fake.run_timeouts()
+
+
+def count_api_calls(func, view):
+    fake.reset_api_calls()
+    func(view)
+    return dict(fake.api_calls)
+
+
+def benchmark_syntax(syntax_name, rows, columns, repeat, settings=None,
+                     only=None):
+    results = {}
+    load_plugin()
+    # middle of the data rows, after header and separator
+    row = rows // 2 + 2
+    for case_name, text in buffer_cases(syntax_name, rows, columns):
+        for command_name, args in PLUGIN_COMMANDS:
+            name = "{0}.{1}.{2}".format(syntax_name, case_name, command_name)
+            if not tbench._selected(name, only):
+                continue
+
+            def setup():
+                return create_view(syntax_name, text, row, settings)
+
+            def func(view):
+                run_command(view, command_name, args)
+
+            result = tbench.measure(func, setup, repeat, memory=False)
+            calls = count_api_calls(func, setup())
+            result["api_calls"] = calls
+            result["api_calls_total"] = sum(calls.values())
+            result["status"] = fake.status[0]
+            results[name] = result
+    return results
+
+
+def run_benchmarks(syntax_names=None, rows=1000, columns=8, repeat=5,
+                   settings=None, only=None):
+    results = {}
+    for syntax_name in syntax_names or tbench.SYNTAX_NAMES:
+        results.update(benchmark_syntax(syntax_name, rows, columns, repeat,
+                                        settings, only))
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"rows": rows, "columns": columns, "repeat": repeat,
+                   "settings": settings or {}},
+        "results": results,
+    }
+
+
+def format_report(run, calls=False):
+    lines = ["{0:<60} {1:>12} {2:>12} {3:>10}".format(
+        "benchmark", "min, ms", "median, ms", "api calls")]
+    for name in sorted(run["results"]):
+        result = run["results"][name]
+        lines.append("{0:<60} {1:>12.3f} {2:>12.3f} {3:>10}".format(
+            name, result["min"] * 1000, result["median"] * 1000,
+            result["api_calls_total"]))
+        if calls:
+            for method, count in sorted(result["api_calls"].items()):
+                lines.append("    {0:<56} {1:>36}".format(method, count))
+    return "\n".join(lines)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--syntax", action="append",
+                        choices=tbench.SYNTAX_NAMES,
+                        help="benchmark only given syntax, can be repeated")
+    parser.add_argument("--only", action="append", metavar="PATTERN",
+                        help="benchmark only names matched by the pattern, "
+                        "for example '*.aligned.*', can be repeated")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--set", action="append", default=[],
+                        metavar="SETTING=JSON",
+                        help="view setting, for example "
+                        "table_editor_fast_align=false, can be repeated")
+    parser.add_argument("--calls", action="store_true",
+                        help="show count of every view API call")
+    parser.add_argument("--json", metavar="FILE",
+                        help="write results as JSON into FILE, '-' for stdout")
+    return parser.parse_args(argv)
+
+
+def parse_settings(items):
+    settings = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        settings[key] = json.loads(value) if sep else True
+    return settings
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run = run_benchmarks(args.syntax, args.rows, args.columns, args.repeat,
+                         parse_settings(args.set), args.only)
+    if args.json == "-":
+        json.dump(run, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        print(format_report(run, args.calls))
+        if args.json:
+            tbench._dump_json(run, args.json)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
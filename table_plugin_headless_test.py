@@ -0,0 +1,264 @@
+# table_plugin_headless_test.py - plugin commands tests without Sublime Text
+
+# Copyright (C) 2012  Free Software Foundation, Inc.
+
+# Author: Valery Kocubinsky
+# Package: SublimeTableEditor
+# Homepage: https://github.com/vkocubinsky/SublimeTableEditor
+
+# This file is part of SublimeTableEditor.
+
+# SublimeTableEditor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# SublimeTableEditor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with SublimeTableEditor.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from . import table_plugin_benchmark
+except ValueError:
+    import table_plugin_benchmark
+
+
+class FakeSublimeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # fake sublime modules and the plugin loaded with them are
+        # removed after the tests
+        plugin_name = table_plugin_benchmark.__name__.replace(
+            "table_plugin_benchmark", "table_plugin")
+        cls.module_names = ["sublime", "sublime_plugin", plugin_name]
+        cls.saved_modules = dict((name, sys.modules.get(name))
+                                 for name in cls.module_names)
+        cls.plugin = table_plugin_benchmark.load_plugin()
+        cls.fake = table_plugin_benchmark.fake
+
+    @classmethod
+    def tearDownClass(cls):
+        for name in cls.module_names:
+            if cls.saved_modules[name] is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = cls.saved_modules[name]
+        package, sep, module_name = cls.plugin.__name__.rpartition(".")
+        if package and cls.saved_modules[cls.plugin.__name__] is None:
+            delattr(sys.modules[package], module_name)
+
+    def create_view(self, text, row):
+        return table_plugin_benchmark.create_view("Simple", text, row)
+
+    def testNextField(self):
+        view = self.create_view("""
+| a | b |
+|-|-|
+| 1 | 22 |
+""".strip(), 2)
+        self.fake.reset_api_calls()
+        view.run_command("table_editor_next_field")
+        self.assertTrue(self.fake.api_calls["View.substr"] > 0)
+        self.assertEqual(table_plugin_benchmark.TEXT_BEFORE + """
+| a | b  |
+|---|----|
+| 1 | 22 |
+|   |    |
+""".strip() + table_plugin_benchmark.TEXT_AFTER, view.text())
+        # cursor moves into the first field of new row
+        self.assertEqual((5, 2), view.rowcol(view.sel()[0].b))
+
+    def testKillRows(self):
+        view = self.create_view("""
+| a | b |
+|---|---|
+| 1 | 2 |
+| 3 | 4 |
+| 5 | 6 |
+| 7 | 8 |
+""".strip(), 2)
+        row = table_plugin_benchmark.TEXT_BEFORE.count("\n") + 2
+        view.sel().clear()
+        view.sel().add(self.fake.Region(view.text_point(row, 2),
+                                        view.text_point(row + 2, 2)))
+        view.run_command("table_editor_kill_row")
+        self.assertEqual(table_plugin_benchmark.TEXT_BEFORE + """
+| a | b |
+|---|---|
+| 7 | 8 |
+""".strip() + table_plugin_benchmark.TEXT_AFTER, view.text())
+
+    def create_viewport_view(self, text):
+        settings = {"table_editor_viewport_first": True,
+                    "table_editor_viewport_first_min_rows": 10,
+                    "table_editor_viewport_chunk_size": 5}
+        view = table_plugin_benchmark.create_view("Simple", text, 2, settings)
+        view.visible_lines = 8
+        return view
+
+    def viewport_table(self):
+        text = "\n".join("|{0}|{1}|".format("x" * (ind % 4), ind)
+                          for ind in range(30))
+        syntax = table_plugin_benchmark.table_lib.simple_syntax()
+        return text, syntax.table_parser.parse_text(text).render()
+
+    def testViewportFirst(self):
+        text, aligned = self.viewport_table()
+        view = self.create_viewport_view(text)
+        view.run_command("table_editor_align")
+        # rows out of the visible region are left for the chunks
+        self.assertNotEqual(table_plugin_benchmark.TEXT_BEFORE + aligned +
+                            table_plugin_benchmark.TEXT_AFTER, view.text())
+        self.fake.run_timeouts()
+        self.assertEqual(table_plugin_benchmark.TEXT_BEFORE + aligned +
+                         table_plugin_benchmark.TEXT_AFTER, view.text())
+
+    def testViewportFirstFinishedByNextCommand(self):
+        text, aligned = self.viewport_table()
+        view = self.create_viewport_view(text + "\n\n|a|b|")
+        view.run_command("table_editor_align")
+        # next command on the other table finishes pending chunks
+        row = view.text().splitlines().index("|a|b|")
+        view.sel().clear()
+        view.sel().add(self.fake.Region(view.text_point(row, 1)))
+        view.run_command("table_editor_align")
+        self.assertEqual(table_plugin_benchmark.TEXT_BEFORE + aligned +
+                         "\n\n| a | b |" + table_plugin_benchmark.TEXT_AFTER,
+                         view.text())
+        self.fake.run_timeouts()
+
+    def testViewportFirstChangedView(self):
+        text, aligned = self.viewport_table()
+        view = self.create_viewport_view(text)
+        view.run_command("table_editor_align")
+        view.insert(None, view.size(), "more text")
+        self.fake.run_timeouts()
+        # the table is left partially aligned and it is reported
+        lines = view.text().splitlines()
+        self.assertTrue(aligned.splitlines()[1] in lines)
+        self.assertTrue(text.splitlines()[29] in lines)
+        self.assertTrue("partially aligned" in self.fake.status[0])
+
+    def testCsvToTable(self):
+        view = self.create_view("name,age\nAnna,20\nBob,7", 0)
+        row = table_plugin_benchmark.TEXT_BEFORE.count("\n")
+        view.sel().clear()
+        view.sel().add(self.fake.Region(view.text_point(row, 0),
+                                        view.text_point(row + 2, 5)))
+        view.run_command("table_editor_csv_to_table")
+        self.assertEqual(table_plugin_benchmark.TEXT_BEFORE + """
+| name | age |
+| Anna | 20  |
+| Bob  | 7   |
+""".strip() + table_plugin_benchmark.TEXT_AFTER, view.text())
+        # cursor is placed into the first field
+        self.assertEqual((row, 6), view.rowcol(view.sel()[0].b))
+        self.assertEqual("Table Editor: Table created from CSV",
+                         self.fake.status[0])
+
+        view = self.create_view("a\nb", 0)
+        view.sel().clear()
+        view.sel().add(self.fake.Region(view.text_point(row, 0),
+                                        view.text_point(row + 1, 1)))
+        view.run_command("table_editor_csv_to_table")
+        self.assertEqual("Table Editor: Table created from CSV, CSV dialect "
+                         "is not detected, a line is a row", self.fake.status[0])
+
+    def testTableToCsvFile(self):
+        view = self.create_view("""
+| a | b |
+|---|---|
+| 1 | 2 |
+""".strip(), 2)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "table.csv")
+            view.run_command("table_editor_table_to_csv", {"path": path})
+            with io.open(path, encoding="utf-8", newline="") as f:
+                self.assertEqual("a,b\n1,2\n", f.read())
+            self.assertEqual("Table Editor: 2 rows exported to CSV",
+                             self.fake.status[0])
+
+            # unknown dialect is reported, not raised
+            os.remove(path)
+            view.run_command("table_editor_table_to_csv",
+                             {"path": path, "dialect": "unknown"})
+            self.assertFalse(os.path.exists(path))
+            self.assertTrue("unknown" in self.fake.status[0])
+
+            # write error is reported, not raised
+            path = os.path.join(tmp_dir, "missing", "table.csv")
+            view.run_command("table_editor_table_to_csv", {"path": path})
+            self.assertFalse(os.path.exists(path))
+            self.assertTrue("table.csv" in self.fake.status[0])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def testConvertSyntax(self):
+        view = self.create_view("""
+| a | b |
+|---|---|
+| 1 | 2 |
+""".strip(), 2)
+        view.run_command("table_editor_convert_syntax",
+                         {"syntax": "reStructuredText"})
+        self.assertEqual("reStructuredText",
+                         view.settings().get("table_editor_syntax"))
+        converted = view.text()
+        # align parses the table with the new syntax and keeps it
+        view.run_command("table_editor_align")
+        self.assertEqual(converted, view.text())
+        self.assertTrue("+---+---+" in converted)
+
+    def testProfileAlignWriteError(self):
+        view = self.create_view("|a|b|", 0)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "missing", "align.prof")
+            view.run_command("table_editor_profile_align", {"path": path})
+            self.assertTrue("align.prof" in self.fake.status[0])
+            panel = view.window().panels["table_editor_profile"]
+            self.assertTrue(panel.text().startswith("Profile is not written"))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def testInTableContext(self):
+        view = self.create_view("""
+| a | b |
++---+---+
+""".strip(), 0)
+        listener = self.plugin.TableEditorContextListener()
+
+        def in_table(point, key="table_editor_in_table"):
+            view.sel().clear()
+            view.sel().add(self.fake.Region(point))
+            return listener.on_query_context(view, key, self.fake.OP_EQUAL,
+                                             True, True)
+
+        row = table_plugin_benchmark.TEXT_BEFORE.count("\n")
+        self.assertFalse(in_table(view.text_point(row - 1, 0)))
+        self.assertFalse(in_table(view.text_point(row, 0)))
+        self.assertTrue(in_table(view.text_point(row, 1)))
+        self.assertTrue(in_table(view.text_point(row, 9)))
+        self.assertFalse(in_table(view.text_point(row, 9),
+                                  "table_editor_in_table_field"))
+        self.assertTrue(in_table(view.text_point(row + 1, 4),
+                                 "table_editor_in_table_field"))
+        self.assertIsNone(listener.on_query_context(
+            view, "unknown", self.fake.OP_EQUAL, True, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
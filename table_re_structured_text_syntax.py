@@ -42,8 +42,9 @@ class ReStructuredTextTableSyntax(tbase.TableSyntax):
     def __init__(self, table_configuration):
         tbase.TableSyntax.__init__(self, "reStructuredText", table_configuration)
 
+        self.line_parser = tborder.create_line_parser()
         self.table_parser = tborder.BorderTableParser(self)
-        self.table_driver = tborder.BorderTableDriver(self)
+        self.table_driver = tborder.GridTableDriver(self)
 
         self.hline_out_border = '+'
         self.hline_in_border = '+'
@@ -31,9 +31,11 @@ import re
 try:
     from . import table_base as tbase
     from . import table_border_syntax as tborder
+    from . import table_line_parser as tparser
 except ValueError:
     import table_base as tbase
     import table_border_syntax as tborder
+    import table_line_parser as tparser
 
 
 def create_syntax(table_configuration=None):
@@ -46,8 +48,14 @@ class SimpleTableSyntax(tbase.TableSyntax):
         tbase.TableSyntax.__init__(self, "Simple", table_configuration)
         self.custom_column_alignment = self.table_configuration.custom_column_alignment
 
+        if self.custom_column_alignment:
+            self.line_parser = tborder.create_line_parser(
+                CustomAlignColumn.CELL_PATTERN)
+        else:
+            self.line_parser = tborder.create_line_parser()
         self.table_parser = SimpleTableParser(self)
-        self.table_driver = tborder.BorderTableDriver(self)
+        self.table_driver = SimpleTableDriver(self)
+        self.formula_support = True
 
 
         self.hline_out_border = '|'
@@ -65,6 +73,8 @@ class CustomAlignColumn(tbase.Column):
                  '#': tbase.Column.ALIGN_CENTER}
 
     PATTERN = r"^\s*((?:[\<]+)|(?:[\>]+)|(?:[\#]+))\s*$"
+    CELL_PATTERN = r"\s*(?:<+|>+|#+)\s*"
+    __slots__ = ('align_char',)
 
     def __init__(self, row, data):
         tbase.Column.__init__(self, row)
@@ -86,6 +96,7 @@ class CustomAlignColumn(tbase.Column):
 
 
 class CustomAlignRow(tbase.Row):
+    __slots__ = ()
 
     def new_empty_column(self):
         return CustomAlignColumn(self, '#')
@@ -97,19 +108,25 @@ class CustomAlignRow(tbase.Row):
         return True
 
 
-class SimpleTableParser(tborder.BorderTableParser):
+class SimpleTableDriver(tborder.BorderTableDriver):
+    ALIGN_CHAR = {tbase.Column.ALIGN_LEFT: '<',
+                  tbase.Column.ALIGN_RIGHT: '>',
+                  tbase.Column.ALIGN_CENTER: '#',
+                  None: '<'}
 
-    def _is_custom_align_row(self, str_cols):
-        if len(str_cols) == 0:
-            return False
-        for col in str_cols:
-            if not CustomAlignColumn.match_cell(col):
-                return False
-        return True
+    def create_align_row(self, table, aligns):
+        if not self.syntax.custom_column_alignment or not any(aligns):
+            return None
+        row = CustomAlignRow(table)
+        for align in aligns:
+            row.append(CustomAlignColumn(row, self.ALIGN_CHAR[align]))
+        return row
+
+
+class SimpleTableParser(tborder.BorderTableParser):
 
     def create_row(self, table, line):
-        if (self.syntax.custom_column_alignment and
-                self._is_custom_align_row(line.str_cols())):
+        if line.kind == tparser.Line.ALIGN:
             row = CustomAlignRow(table)
         else:
             row = tborder.BorderTableParser.create_row(self, table, line)
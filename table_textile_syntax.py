@@ -46,31 +46,74 @@ class TextileTableSyntax(tbase.TableSyntax):
         tbase.TableSyntax.__init__(self, "Textile", table_configuration)
 
         self.table_parser = TextileTableParser(self)
-        self.table_driver = tbase.TableDriver(self)
+        self.table_driver = TextileTableDriver(self)
+
+
+# single character modifiers of a cell
+TERM_CHARS = "_<>=~^:-"
+
+
+def parse_cell_attr(text):
+    """
+    Split Textile cell text into attributes terminated by a period and data,
+    return (attr, data) or None if the cell has no attributes.
+
+    Attributes are a sequence of terms: single character modifiers
+    _<>=~^:-, row and col spans /2 and \\2, styles {...} and classes (...).
+    The result is the same as of the regular expression
+
+        \\s*((?:[_<>=~^:-]|[/\\\\]\\d+|\\{.*?\\}|\\(.*?\\))+\\.)\\s+(.*)$
+
+    but text is scanned once from right to left, so the time is linear for
+    any text. ends[i] is the period which terminates attributes when a term
+    starts at i, the same period regular expression backtracking finds first.
+    """
+    start = len(text) - len(text.lstrip())
+    n = len(text)
+    ends = [None] * (n + 1)
+    # first '}' or ')' after i with attributes continued after it
+    brace_close = None
+    paren_close = None
+    # end of digits after i
+    digits_end = n
+    for i in range(n - 1, -1, -1):
+        c = text[i]
+        if c == '.':
+            if text[i + 1:i + 2].isspace():
+                ends[i] = i
+        elif c in TERM_CHARS:
+            ends[i] = ends[i + 1]
+        elif c in '/\\':
+            if digits_end > i + 1:
+                ends[i] = ends[digits_end]
+        elif c == '{':
+            if brace_close is not None:
+                ends[i] = ends[brace_close + 1]
+        elif c == '(':
+            if paren_close is not None:
+                ends[i] = ends[paren_close + 1]
+
+        if c == '}' and ends[i + 1] is not None:
+            brace_close = i
+        elif c == ')' and ends[i + 1] is not None:
+            paren_close = i
+        if not '0' <= c <= '9':
+            digits_end = i
+
+    if start == n or text[start] == '.' or ends[start] is None:
+        return None
+    end = ends[start]
+    return text[start:end + 1], text[end + 1:].strip()
 
 
 class TextileCellColumn(tbase.Column):
-    PATTERN = (
-        r"\s*("
-        # Sequence of one or more table cell terms
-        r"(?:"
-            # Single character modifiers
-            r"[_<>=~^:-]|"
-            # Row and col spans
-            r"(?:[/\\]\d+)|"
-            # Styling and classes
-            r"(?:\{.*?\})|(?:\(.*?\))"
-        r")+"
-        # Terminated by a period
-        r"\.)\s+(.*)$")
     COLSPAN_PATTERN = r"\\(\d+)"
     ROWSPAN_PATTERN = r"/(\d+)"
+    __slots__ = ('attr', 'data')
 
-    def __init__(self, row, data):
+    def __init__(self, row, data, cell=None):
         tbase.Column.__init__(self, row)
-        cell_mo = re.match(TextileCellColumn.PATTERN, data)
-        self.attr = cell_mo.group(1)
-        self.data = cell_mo.group(2).strip()
+        self.attr, self.data = cell or parse_cell_attr(data)
 
         colspan_mo = re.search(TextileCellColumn.COLSPAN_PATTERN, self.attr)
         if colspan_mo:
@@ -101,17 +144,19 @@ class TextileCellColumn(tbase.Column):
 
     @staticmethod
     def match_cell(str_col):
-        return re.match(TextileCellColumn.PATTERN, str_col)
+        return parse_cell_attr(str_col)
 
 
 class TextileRow(tbase.Row):
+    __slots__ = ()
 
     def new_empty_column(self):
         return tbase.DataColumn(self, '')
 
     def create_column(self, text):
-        if TextileCellColumn.match_cell(text):
-            return TextileCellColumn(self, text)
+        cell = parse_cell_attr(text)
+        if cell is not None:
+            return TextileCellColumn(self, text, cell)
         else:
             return tbase.DataColumn(self, text)
 
@@ -127,6 +172,36 @@ class TextileRow(tbase.Row):
         return True
 
 
+class TextileTableDriver(tbase.TableDriver):
+    ALIGN_ATTR = {tbase.Column.ALIGN_LEFT: '<',
+                  tbase.Column.ALIGN_RIGHT: '>',
+                  tbase.Column.ALIGN_CENTER: '=',
+                  None: ''}
+
+    def create_content_row(self, table, cells, header=False):
+        row = TextileRow(table)
+        for text, colspan, align in cells:
+            attr = '_' if header else self.ALIGN_ATTR[align]
+            if colspan > 1:
+                attr += '\\{0}'.format(colspan)
+            if attr:
+                row.append(TextileCellColumn(row, attr + '. ' + text))
+            else:
+                row.append(tbase.DataColumn(row, text))
+        return row
+
+    def cell_align(self, column):
+        if not isinstance(column, TextileCellColumn) or '<>' in column.attr:
+            return None
+        elif '>' in column.attr:
+            return tbase.Column.ALIGN_RIGHT
+        elif '<' in column.attr:
+            return tbase.Column.ALIGN_LEFT
+        elif '=' in column.attr:
+            return tbase.Column.ALIGN_CENTER
+        return None
+
+
 class TextileTableParser(tbase.BaseTableParser):
 
     def create_row(self, table, line):